@@ -0,0 +1,220 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from NumberTheory import inverseModulo, inverseModuloBatch, modulo
+from ECC.Elliptic_Curve import EllipticCurve
+
+"""
+Giải bài toán logarit rời rạc trên đường cong Elliptic (ECDLP): tìm k với Q = k * G
+- Pollard rho (r-adding walk) khi biết cấp nguyên tố n của G
+- Kangaroo kiểu Gaudry-Schost khi chỉ biết k nằm trong [0, bound)
+- Mỗi process đi một lô walk, cộng điểm affine với nghịch đảo gộp (Montgomery trick)
+- Điểm phân biệt được gom về một bảng chung ở process chính
+"""
+
+PARTITIONS = 32       # Số bước trong bảng r-adding
+WALKS_PER_TASK = 64   # Số walk đi song song trong một task (chung một phép nghịch đảo)
+DP_PER_TASK = 64      # Số điểm phân biệt một task trả về
+
+
+# Trạng thái dùng chung của worker, gửi một lần qua initializer
+_state = None
+
+
+def _init_worker(a, b, p, G, Q, steps, mode, order, bound, dp_bits):
+    """Initializer: dựng đường cong, bảng bước R_j = a_j G + b_j Q và tham số walk."""
+    global _state
+    curve = EllipticCurve(a, b, p)
+    table = [(curve.point_add(curve.point_multiply(sa, G), curve.point_multiply(sb, Q)), sa, sb)
+             for sa, sb in steps]
+    _state = (curve, G, Q, table, mode, order, bound, (1 << dp_bits) - 1)
+
+
+def _random_start(rng):
+    """Điểm xuất phát a G + b Q ngẫu nhiên theo chế độ walk."""
+    curve, G, Q, _, mode, order, bound, _ = _state
+    if mode == "rho":
+        a, b = rng.randrange(order), rng.randrange(order)
+    elif rng.random() < 0.5:
+        # Tame: a ngẫu nhiên trong [0, bound)
+        a, b = rng.randrange(bound), 0
+    else:
+        # Wild: k + a với a trong [-bound/4, bound/4)
+        a, b = rng.randrange(bound // 2) - bound // 4, 1
+    # Kangaroo chỉ có b ∈ {0, 1}, rho cần đúng b Q để (a, b) mô tả điểm xuất phát
+    P = curve.point_add(curve.point_multiply(a, G) if a else None,
+                        curve.point_multiply(b, Q) if b else None)
+    return P, a, b
+
+
+def _walk_task(seed):
+    """Worker: đi WALKS_PER_TASK walk song song, trả về DP_PER_TASK điểm phân biệt (P, a, b) và số phép cộng điểm."""
+    curve, G, Q, table, mode, order, bound, dp_mask = _state
+    p = curve.p
+    rng = random.Random(seed)
+    walks = []
+    while len(walks) < WALKS_PER_TASK:
+        P, a, b = _random_start(rng)
+        if P is not None:
+            walks.append([P, a, b])
+
+    found = []
+    ops = 0
+    max_len = 20 * (dp_mask + 1)
+    lengths = [0] * len(walks)
+    while len(found) < DP_PER_TASK:
+        # Chọn bước cho từng walk và gộp các mẫu số x_R - x_P để nghịch đảo một lần
+        picks = [table[w[0][0] & (PARTITIONS - 1)] for w in walks]
+        dens = [modulo(R[0] - w[0][0], p) for (R, _, _), w in zip(picks, walks)]
+        invs = inverseModuloBatch(dens, p)
+        ops += len(walks)
+
+        for i, w in enumerate(walks):
+            (R, sa, sb) = picks[i]
+            (x1, y1) = w[0]
+            if dens[i] == 0:
+                # x trùng nhau: nhân đôi hoặc ra điểm vô cực, xử lý riêng
+                P = curve.point_add(w[0], R)
+            else:
+                lam = (R[1] - y1) * invs[i] % p
+                x3 = (lam * lam - x1 - R[0]) % p
+                P = (x3, (lam * (x1 - x3) - y1) % p)
+            w[1] += sa
+            w[2] += sb
+            if mode == "rho":
+                w[1] %= order
+                w[2] %= order
+            lengths[i] += 1
+
+            if P is not None and (P[0] >> 5) & dp_mask == 0:
+                found.append((P, w[1], w[2]))
+                P = None
+            if P is None or lengths[i] > max_len:
+                # Gặp điểm phân biệt (hoặc walk quá dài/điểm vô cực): xuất phát lại
+                P, a, b = None, 0, 0
+                while P is None:
+                    P, a, b = _random_start(rng)
+                w[1], w[2] = a, b
+                lengths[i] = 0
+            w[0] = P
+    return found, ops
+
+
+def _solve_collision(first, second, mode, order):
+    """Từ a1 G + b1 Q = a2 G + b2 Q suy ra k (mod order với rho, số nguyên với kangaroo)."""
+    a1, b1 = first
+    a2, b2 = second
+    if b1 == b2:
+        return None
+    if mode == "rho":
+        return (a2 - a1) * inverseModulo((b1 - b2) % order, order) % order
+    # Kangaroo: đúng một trong hai là wild (b = 1)
+    return (a2 - a1) if b1 == 1 else (a1 - a2)
+
+
+def solve_ecdlp(curve, G, Q, order=None, bound=None, use_parallel=True, dp_bits=None, stats=None):
+    """
+    Tìm k với Q = k * G trên curve.
+
+    Args:
+        order: cấp nguyên tố của G (dùng Pollard rho)
+        bound: cận trên của k nếu không biết cấp (dùng kangaroo Gaudry-Schost)
+        dp_bits: số bit 0 của điểm phân biệt (mặc định ~ log2(sqrt(N)) / 2)
+        stats: dict nhận số phép cộng điểm đã dùng ('ops')
+
+    Returns:
+        k hoặc None
+    """
+    if Q is None:
+        return 0
+    if order is None and bound is None:
+        raise ValueError("Cần order (cấp nguyên tố của G) hoặc bound (cận trên của k)")
+    mode = "rho" if order is not None else "kangaroo"
+    size = order if mode == "rho" else bound
+    if dp_bits is None:
+        dp_bits = max(0, (size.bit_length() // 2 - 6) // 2)
+
+    rng = random.Random()
+    mean = max(1, size >> (dp_bits + 6))
+    steps = []
+    while len(steps) < PARTITIONS:
+        if mode == "rho":
+            sa, sb = rng.randrange(order), rng.randrange(order)
+        else:
+            # Bước nhảy dương, trung bình nhỏ so với bound để walk không rời vùng tame/wild
+            sa, sb = rng.randrange(1, 2 * mean + 1), 0
+        # Bước R_j là điểm vô cực thì walk không đi được, bốc lại
+        if curve.point_add(curve.point_multiply(sa, G), curve.point_multiply(sb, Q)) is not None:
+            steps.append((sa, sb))
+
+    args = (curve.a, curve.b, curve.p, G, Q, steps, mode, order, bound, dp_bits)
+    table = {}
+    total_ops = 0
+    seeds = iter(lambda: random.getrandbits(64), None)
+    pool = None
+    try:
+        if use_parallel:
+            pool = multiprocessing.Pool(multiprocessing.cpu_count(), initializer=_init_worker, initargs=args)
+            batches = pool.imap_unordered(_walk_task, seeds)
+        else:
+            _init_worker(*args)
+            batches = map(_walk_task, seeds)
+
+        for found, ops in batches:
+            total_ops += ops
+            for P, a, b in found:
+                if P not in table:
+                    table[P] = (a, b)
+                    continue
+                k = _solve_collision(table[P], (a, b), mode, order)
+                if k is not None and curve.point_multiply(k, G) == Q:
+                    if stats is not None:
+                        stats['ops'] = total_ops
+                    return k
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def benchmark(bits_list=(32, 36, 40), trials=1, use_parallel=True):
+    """
+    Đo tốc độ phá khóa EC ElGamal nhỏ: với mỗi bit, tạo hệ bằng ElGamal_ECC_setup,
+    giải lại private_key bằng kangaroo trên [0, p + 1] và so số phép cộng điểm
+    thực tế với kỳ vọng ~2.08 sqrt(N) của Gaudry-Schost.
+    """
+    from ECC.EC_ElGamal.EC_ElGamal import ElGamal_ECC_setup
+
+    results = []
+    for bit in bits_list:
+        for _ in range(trials):
+            while True:
+                try:
+                    curve, G, n, private_key, public_key = ElGamal_ECC_setup(bit, output_file=os.devnull)
+                    break
+                except ValueError:
+                    continue  # Không sinh được điểm trên đường cong, thử đường cong khác
+
+            stats = {}
+            start = time.time()
+            k = solve_ecdlp(curve, G, public_key, bound=n + 1, use_parallel=use_parallel, stats=stats)
+            elapsed = time.time() - start
+            expected = 2.08 * math.isqrt(n + 1)
+            ok = k is not None and curve.point_multiply(k, G) == public_key
+            results.append({
+                'bits': bit, 'ok': ok, 'time': elapsed,
+                'expected_ops': int(expected), 'observed_ops': stats.get('ops', 0),
+            })
+            print(f"{bit:3d} bit: {'OK ' if ok else 'FAIL'}  {elapsed:8.2f}s  "
+                  f"ops = {stats.get('ops', 0):,} / kỳ vọng {int(expected):,} "
+                  f"({stats.get('ops', 0) / expected:.2f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method('spawn', force=True)
+    multiprocessing.freeze_support()
+
+    benchmark()
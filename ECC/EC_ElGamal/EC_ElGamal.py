@@ -4,7 +4,7 @@ from gmpy2 import mpz
 
 from Prime_All import generate_prime_bit
 from ECC.Elliptic_Curve import EllipticCurve
-from SubDef.String_Point import string_to_point, point_to_string
+from SubDef.String_Point import string_to_points, points_to_string
 
 def get_input_by_key(file_name):
     """Lấy dữ liệu từ file. Trả về: 1 dict theo chỉ mục"""
@@ -191,10 +191,33 @@ def ElGamal_ECC_decrypt(C1, C2, curve=None, private_key=None,
     return M
 
 
+def ElGamal_ECC_encrypt_blocks(message, curve, G, public_key, n):
+    """Mã hóa thông điệp dài tùy ý: danh sách cặp (C1, C2), mỗi khối một điểm (xem string_to_points)"""
+    pairs = []
+    for M in string_to_points(message, curve):
+        k = random.randint(1, n - 1)
+        pairs.append((curve.point_multiply(k, G), curve.point_add(M, curve.point_multiply(k, public_key))))
+    return pairs
+
+
+def ElGamal_ECC_decrypt_blocks(cypher_blocks, curve, private_key):
+    """Giải mã dãy cặp (C1, C2) của ElGamal_ECC_encrypt_blocks về chuỗi ban đầu"""
+    points = []
+    for C1, C2 in cypher_blocks:
+        S = curve.point_multiply(private_key, C1)
+        points.append(curve.point_add(C2, (S[0], (-S[1]) % curve.p)))
+    return points_to_string(points, curve)
+
+
 def ElGamal_ECC_encrypt_text(text, curve=None, G=None, public_key=None, n=None,
                              input_file="EC_ElGamal_information.txt",
                              output_file="./EC_ElGamal_Cryptosystem/EC_ElGamal_encrypted.txt"):
-    """Mã hóa chuỗi văn bản"""
+    """
+    Mã hóa chuỗi văn bản (độ dài tùy ý, kể cả chuỗi rỗng)
+
+    Returns:
+        Danh sách cặp (C1, C2), mỗi khối 0x01 || dữ liệu một điểm (ElGamal_ECC_encrypt_blocks)
+    """
     # Đọc thông tin nếu cần
     if curve is None:
         data = get_input_by_key(input_file)
@@ -206,27 +229,29 @@ def ElGamal_ECC_encrypt_text(text, curve=None, G=None, public_key=None, n=None,
         public_key = data["public_key"]
         n = data["n"]
 
-    # Chuyển text thành điểm
-    message_point, offset = string_to_point(text, curve)
-
     # Mã hóa
-    C1, C2 = ElGamal_ECC_encrypt(message_point, curve, G, public_key, n, input_file, output_file)
+    pairs = ElGamal_ECC_encrypt_blocks(text, curve, G, public_key, n)
 
-    # Lưu thêm offset
+    # Lưu kết quả
     try:
-        with open(output_file, "a") as file:
-            print(f"offset: {offset}", file=file)
+        with open(output_file, "w") as file:
+            print(f"blocks: {tuple(pairs)}", file=file)
     except Exception as e:
         print(f"Lỗi khi lưu file: {e}")
 
-    return (C1, C2, offset)
+    return pairs
 
 
-def ElGamal_ECC_decrypt_text(C1=None, C2=None, offset=None, curve=None, private_key=None,
+def ElGamal_ECC_decrypt_text(cypher_blocks=None, curve=None, private_key=None,
                              input_file="EC_ElGamal_information.txt",
                              cypher_file="./EC_ElGamal_Cryptosystem/EC_ElGamal_encrypted.txt",
                              output_file="./EC_ElGamal_Cryptosystem/EC_ElGamal_decrypted.txt"):
-    """Giải mã chuỗi văn bản"""
+    """
+    Giải mã chuỗi văn bản
+
+    Args:
+        cypher_blocks: Danh sách cặp (C1, C2) của ElGamal_ECC_encrypt_text (mặc định đọc từ cypher_file)
+    """
     # Đọc thông tin nếu cần
     if curve is None:
         data = get_input_by_key(input_file)
@@ -236,21 +261,16 @@ def ElGamal_ECC_decrypt_text(C1=None, C2=None, offset=None, curve=None, private_
         curve = EllipticCurve(a, b, p)
         private_key = data["private_key"]
 
-    if C1 is None or C2 is None or offset is None:
+    if cypher_blocks is None:
         data = get_input_by_key(cypher_file)
-        C1 = data["C1"]
-        C2 = data["C2"]
-        offset = data["offset"]
+        cypher_blocks = data["blocks"]
 
     # Giải mã
-    message_point = ElGamal_ECC_decrypt(C1, C2, curve, private_key, input_file, cypher_file, output_file)
-
-    # Chuyển điểm thành text
-    text = point_to_string(message_point, offset, curve)
+    text = ElGamal_ECC_decrypt_blocks(cypher_blocks, curve, private_key)
 
     # Lưu kết quả
     try:
-        with open(output_file, "a") as file:
+        with open(output_file, "w") as file:
             print(f"plaintext: {text}", file=file)
     except Exception as e:
         print(f"Lỗi khi lưu file: {e}")
@@ -281,10 +301,10 @@ if __name__ == "__main__":
     plaintext = "NguyenHaiNam23021643"
     print(f"Văn bản gốc: {plaintext}")
 
-    C1, C2, offset = ElGamal_ECC_encrypt_text(plaintext)
-    print(f"C1: {C1}")
-    print(f"C2: {C2}")
-    print(offset)
+    cypher_blocks = ElGamal_ECC_encrypt_text(plaintext)
+    for C1, C2 in cypher_blocks:
+        print(f"C1: {C1}")
+        print(f"C2: {C2}")
 
     # 3. Giải mã
     print("\n=== BƯỚC 3: Giải mã ===")
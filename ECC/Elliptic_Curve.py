@@ -2,7 +2,10 @@ import hashlib
 import os
 import random
 
-from NumberTheory import inverseModulo, moduloPower, modulo
+from gmpy2 import mpz
+
+from NumberTheory import inverseModulo, moduloPower, modulo, sqrt_mod
+from Performance import instrument
 
 
 class EllipticCurve:
@@ -31,6 +34,7 @@ class EllipticCurve:
         x, y = point
         return modulo(moduloPower(y, 2, self.p) - (moduloPower(x, 3, self.p) + self.a * x + self.b), self.p) == 0
 
+    @instrument(split=lambda self, P, Q: "double" if P == Q else "add")
     def point_add(self, P, Q):
         """
         Phép cộng hai điểm trên đường cong Elliptic
@@ -69,12 +73,65 @@ class EllipticCurve:
 
         return (x3, y3)
 
+    # ----- Tọa độ Jacobian: (X, Y, Z) ứng với (X / Z^2, Y / Z^3), Z = 0 là điểm vô cực -----
+
+    @instrument()
+    def _jacobian_double(self, X, Y, Z):
+        """2 (X, Y, Z) không cần nghịch đảo; M = 3X^2 + aZ^4 rút gọn khi a = 0 hoặc a = -3"""
+        p = self.p
+        if Z == 0 or Y == 0:
+            return (1, 1, 0)
+        YY = Y * Y % p
+        S = 4 * X * YY % p
+        if self.a % p == 0:
+            M = 3 * X * X % p
+        elif self.a % p == p - 3:
+            ZZ = Z * Z % p
+            M = 3 * (X - ZZ) * (X + ZZ) % p
+        else:
+            ZZ = Z * Z % p
+            M = (3 * X * X + self.a * ZZ * ZZ) % p
+        X3 = (M * M - 2 * S) % p
+        Y3 = (M * (S - X3) - 8 * YY * YY) % p
+        Z3 = 2 * Y * Z % p
+        return (X3, Y3, Z3)
+
+    @instrument()
+    def _jacobian_add_affine(self, X1, Y1, Z1, x2, y2):
+        """(X1, Y1, Z1) + (x2, y2) với điểm thứ hai ở tọa độ affine (Z2 = 1, cộng hỗn hợp)"""
+        p = self.p
+        if Z1 == 0:
+            return (x2, y2, 1)
+        Z1Z1 = Z1 * Z1 % p
+        H = (x2 * Z1Z1 - X1) % p
+        R = (y2 * Z1 * Z1Z1 - Y1) % p
+        if H == 0:
+            # Cùng hoành độ: hoặc là phép nhân đôi, hoặc P + (-P) = O
+            return self._jacobian_double(X1, Y1, Z1) if R == 0 else (1, 1, 0)
+        HH = H * H % p
+        HHH = H * HH % p
+        V = X1 * HH % p
+        X3 = (R * R - HHH - 2 * V) % p
+        Y3 = (R * (V - X3) - Y1 * HHH) % p
+        Z3 = Z1 * H % p
+        return (X3, Y3, Z3)
+
+    def _to_affine(self, X, Y, Z):
+        """Jacobian -> affine bằng một phép nghịch đảo duy nhất"""
+        if Z == 0:
+            return None
+        z_inv = inverseModulo(Z, self.p)
+        z_inv2 = z_inv * z_inv % self.p
+        return (X * z_inv2 % self.p, Y * z_inv2 * z_inv % self.p)
+
+    @instrument()
     def point_multiply(self, k, P):
         """
         Phép nhân vô hướng: k * P (cộng P với chính nó k lần)
-        Sử dụng thuật toán "double and add" để tối ưu
+        Double-and-add từ bit cao trên tọa độ Jacobian: không có phép nghịch đảo nào trong vòng lặp,
+        chỉ một phép nghịch đảo khi đổi kết quả về affine
         """
-        if k == 0:
+        if k == 0 or P is None:
             return None  # Điểm vô cực
 
         if k < 0:
@@ -82,17 +139,16 @@ class EllipticCurve:
             k = -k
             P = (P[0], (-P[1]) % self.p)
 
-        result = None  # Điểm vô cực
-        addend = P
-
-        # Thuật toán double-and-add
-        while k:
-            if k & 1:  # Bit thấp nhất là 1
-                result = self.point_add(result, addend)
-            addend = self.point_add(addend, addend)  # Nhân đôi
-            k >>= 1  # Dịch phải 1 bit
+        # Tính trên mpz (nhanh hơn int của Python với số vài trăm bit), trả về lại int
+        x, y = mpz(P[0]) % self.p, mpz(P[1]) % self.p
+        X, Y, Z = x, y, mpz(1)
+        for bit in bin(k)[3:]:
+            X, Y, Z = self._jacobian_double(X, Y, Z)
+            if bit == '1':
+                X, Y, Z = self._jacobian_add_affine(X, Y, Z, x, y)
 
-        return result
+        result = self._to_affine(X, Y, Z)
+        return None if result is None else (int(result[0]), int(result[1]))
 
     def generate_point(self):
         """Tìm một điểm ngẫu nhiên trên đường cong"""
@@ -109,20 +165,8 @@ class EllipticCurve:
         raise ValueError("Không tìm thấy điểm trên đường cong sau 1000 lần thử!")
 
     def _mod_sqrt(self, a, p):
-        """Tính căn bậc hai modulo p (thuật toán Tonelli-Shanks đơn giản)"""
-        # Chỉ làm việc với p ≡ 3 (mod 4) để đơn giản
-        if p % 4 == 3:
-            y = moduloPower(a, (p + 1) // 4, p)
-            if moduloPower(y, 2, p) == a:
-                return y
-
-        # Thử brute force cho số nhỏ
-        if p < 1000000:
-            for y in range(p):
-                if moduloPower(y, 2, p) == a:
-                    return y
-
-        return None
+        """Tính căn bậc hai modulo p (dùng sqrt_mod chung: Tonelli-Shanks / Atkin / Cipolla)"""
+        return sqrt_mod(a, p)
 
     def __str__(self):
         return f"EllipticCurve: y^2 = x^3 + {self.a}x + {self.b} (mod {self.p})"
@@ -179,14 +223,12 @@ class Curve25519:
         # By^2 = x^3 + Ax^2 + x
         # v^2 = u^3 + A*u^2 + u (mod p)
         rhs = (pow(u, 3, self.p) + self.A * pow(u, 2, self.p) + u) % self.p
-        # Tính căn bậc hai modulo p (Tonelli-Shanks có thể dùng)
-        # Với p ≡ 3 (mod 4), có thể dùng v = rhs^((p+1)/4) mod p
-        # Nhưng p = 2^255 - 19 ≡ 5 (mod 8), cần thuật toán phức tạp hơn
-        # Để đơn giản, trả về None hoặc giá trị đã biết
-        # v cho u=9 được biết trước
+        # v cho u=9 được biết trước (giữ đúng dấu của điểm sinh chuẩn)
         if u == 9:
             return 14781619447589544791020593568409986887264606134616475288964881837755586237401
-        return None
+        # p = 2^255 - 19 ≡ 5 (mod 8): sqrt_mod dùng phương pháp Atkin
+        v = sqrt_mod(rhs, self.p)
+        return None if v is None else int(v)
 
     def get_curve_params(self):
         """Trả về dictionary chứa các tham số của đường cong"""
@@ -245,6 +287,7 @@ class Curve25519:
 
         print(f"{'=' * 70}\n")
 
+    @instrument(split=lambda self, P1, P2: "double" if P1 == P2 else "add")
     def point_add(self, P1, P2):
         """Cộng hai điểm trên Ed25519"""
         if self.curve_type != "ed25519":
@@ -12,7 +12,7 @@ Production version cần:
 import time
 from typing import Optional, List, Tuple
 
-from NumberTheory import gcd, moduloPower, modulo
+from NumberTheory import gcd, moduloPower, modulo, perfect_power
 from Prime_All import prime_check, SMALL_PRIMES, generate_prime_bit
 from ECC.Elliptic_Curve import EllipticCurve
 from ECPP_Types import ECPPCertificate  # ✓ Import từ file riêng
@@ -65,6 +65,10 @@ class ECPP:
             if n % p == 0:
                 return False, []
 
+        # Lũy thừa hoàn hảo (kể cả p^k) không bao giờ là số nguyên tố
+        if perfect_power(n) is not None:
+            return False, []
+
         # Step 3: Nếu n nhỏ, dùng deterministic test
         if n < self.SMALL_PRIME_THRESHOLD:
             is_prime = prime_check(n)
@@ -4,7 +4,7 @@ Thuật toán chứng minh tính nguyên tố bằng Elliptic Curve
 """
 
 import math
-from NumberTheory import gcd, moduloPower, modulo, inverseModulo
+from NumberTheory import gcd, moduloPower, modulo, inverseModulo, kronecker, jacobi
 from Prime_All import prime_check, SMALL_PRIMES
 
 
@@ -65,58 +65,14 @@ class ECPPHelper:
         """
         Tính Kronecker symbol (a/n) - mở rộng của Jacobi symbol
         Dùng để tính class number và tìm curve phù hợp
+        (gmpy2 native, xem NumberTheory.kronecker / kronecker_many)
         """
-        if n == 0:
-            return 1 if abs(a) == 1 else 0
-
-        if n < 0:
-            if a < 0:
-                return -ECPPHelper.kronecker_symbol(-a, -n)
-            return ECPPHelper.kronecker_symbol(a, -n)
-
-        # Xử lý n chẵn
-        if n % 2 == 0:
-            if a % 2 == 0:
-                return 0
-            # (a/2) = 1 if a ≡ ±1 (mod 8), else -1
-            k = 0
-            n_temp = n
-            while n_temp % 2 == 0:
-                k += 1
-                n_temp //= 2
-
-            result = ECPPHelper.kronecker_symbol(a, n_temp)
-            if k % 2 == 1:
-                if a % 8 in [1, 7]:
-                    return result
-                else:
-                    return -result
-            return result
-
-        # Jacobi symbol cho n lẻ
-        return ECPPHelper.jacobi_symbol(a, n)
+        return kronecker(a, n)
 
     @staticmethod
     def jacobi_symbol(a, n):
         """Tính Jacobi symbol (a/n)"""
-        if n <= 0 or n % 2 == 0:
-            raise ValueError("n must be positive odd integer")
-
-        a = a % n
-        result = 1
-
-        while a != 0:
-            while a % 2 == 0:
-                a //= 2
-                if n % 8 in [3, 5]:
-                    result = -result
-
-            a, n = n, a
-            if a % 4 == 3 and n % 4 == 3:
-                result = -result
-            a = a % n
-
-        return result if n == 1 else 0
+        return jacobi(a, n)
 
     @staticmethod
     def compute_hilbert_class_polynomial(D):
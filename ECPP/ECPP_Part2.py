@@ -4,9 +4,13 @@ Tính số điểm trên đường cong elliptic (critical cho ECPP)
 """
 
 import random
-from NumberTheory import gcd, moduloPower, modulo, inverseModulo
+
+import numpy as np
+
+from NumberTheory import gcd, moduloPower, modulo, inverseModulo, kronecker_many
 from Prime_All import prime_check
 from ECC.Elliptic_Curve import EllipticCurve
+from SubDef.SD_ECM import ecm_factor
 
 
 class CurveOrderCounter:
@@ -21,22 +25,13 @@ class CurveOrderCounter:
         if p > 10000:
             raise ValueError("Naive counting chỉ dùng cho p nhỏ (<10000)")
         
-        count = 1  # Điểm vô cực
-        
-        for x in range(p):
-            # Tính y² = x³ + ax + b (mod p)
-            y_squared = modulo(moduloPower(x, 3, p) + a * x + b, p)
-            
-            # Kiểm tra y_squared có phải là quadratic residue không
-            # Dùng Legendre symbol (y²/p)
-            legendre = moduloPower(y_squared, (p - 1) // 2, p)
-            
-            if legendre == 0:
-                count += 1  # y = 0
-            elif legendre == 1:
-                count += 2  # Có 2 giá trị y
+        # Tính y² = x³ + ax + b (mod p) cho mọi x
+        x = np.arange(p, dtype=np.int64)
+        y_squared = (x * x % p * x + a % p * x + b % p) % p
         
-        return count
+        # Mỗi x đóng góp 1 + (y²/p) điểm: 2 nếu là thặng dư, 1 nếu y = 0, 0 nếu không
+        # Ký hiệu Legendre tính theo lô bằng kronecker_many thay cho tiêu chuẩn Euler
+        return 1 + p + int(kronecker_many(y_squared, p).sum(dtype=np.int64))
     
     @staticmethod
     def schoof_algorithm_simplified(a, b, p):
@@ -114,7 +109,11 @@ class CurveOrderCounter:
         # Thử nhiều discriminants
         from ECPP_Core import ECPPHelper
         
-        for D in ECPPHelper.SMALL_DISCRIMINANTS:
+        # Lọc cả danh sách discriminant bằng một lần gọi kronecker_many: chỉ giữ (D/p) = 1
+        symbols = kronecker_many(ECPPHelper.SMALL_DISCRIMINANTS, p)
+        for D, symbol in zip(ECPPHelper.SMALL_DISCRIMINANTS, symbols):
+            if symbol != 1:
+                continue
             try:
                 # Tìm curve từ discriminant
                 result = CurveOrderCounter._try_discriminant(D, p, min_q)
@@ -204,6 +203,15 @@ class CurveOrderCounter:
             if remaining < min_size:
                 return None
         
+        # Bóc các thừa số cỡ trung bình bằng ECM, giữ lại phần dư lớn
+        while remaining >= min_size and not prime_check(remaining):
+            d = ecm_factor(remaining, B1=2000, curves=25, use_parallel=False)
+            if d is None:
+                return None
+            d = min(d, remaining // d)
+            while remaining % d == 0:
+                remaining //= d
+
         # Check nếu remaining là prime và đủ lớn
         if remaining >= min_size and prime_check(remaining):
             return remaining
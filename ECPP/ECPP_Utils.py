@@ -3,7 +3,7 @@ ECPP Utilities - Cornacchia Algorithm và các hàm hỗ trợ
 Đây là các thuật toán quan trọng cho CM (Complex Multiplication)
 """
 
-from NumberTheory import gcd, moduloPower, modulo, inverseModulo
+from NumberTheory import gcd, modulo, inverseModulo, sqrt_mod, kronecker_many
 from ECPP_Types import ECPPCertificate  # ✓ Import từ file types riêng
 import random
 
@@ -23,55 +23,8 @@ class ECPPUtils:
         Returns:
             r sao cho r² ≡ n (mod p), hoặc None nếu không tồn tại
         """
-        # Kiểm tra n có phải quadratic residue không
-        if moduloPower(n, (p - 1) // 2, p) != 1:
-            return None
-
-        # Trường hợp đặc biệt: p ≡ 3 (mod 4)
-        if p % 4 == 3:
-            r = moduloPower(n, (p + 1) // 4, p)
-            if modulo(r * r, p) == modulo(n, p):
-                return r
-            return None
-
-        # Trường hợp tổng quát: p ≡ 1 (mod 4)
-        # Viết p - 1 = Q * 2^S với Q lẻ
-        Q = p - 1
-        S = 0
-        while Q % 2 == 0:
-            Q //= 2
-            S += 1
-
-        # Tìm quadratic non-residue z
-        z = 2
-        while moduloPower(z, (p - 1) // 2, p) != p - 1:
-            z += 1
-
-        # Khởi tạo
-        M = S
-        c = moduloPower(z, Q, p)
-        t = moduloPower(n, Q, p)
-        R = moduloPower(n, (Q + 1) // 2, p)
-
-        while True:
-            if t == 0:
-                return 0
-            if t == 1:
-                return R
-
-            # Tìm i nhỏ nhất sao cho t^(2^i) = 1
-            i = 1
-            temp = modulo(t * t, p)
-            while temp != 1 and i < M:
-                temp = modulo(temp * temp, p)
-                i += 1
-
-            # Update
-            b = moduloPower(c, 1 << (M - i - 1), p)
-            M = i
-            c = modulo(b * b, p)
-            t = modulo(t * c, p)
-            R = modulo(R * b, p)
+        # Dùng bộ khai căn chung (cache phần tử không chính phương theo p)
+        return sqrt_mod(n, p)
 
     @staticmethod
     def cornacchia(D, p):
@@ -210,12 +163,10 @@ class ECPPUtils:
 
         valid_discriminants = []
 
-        for D in ECPPHelper.SMALL_DISCRIMINANTS:
-            if abs(D) > max_D:
-                break
-
-            # Kiểm tra Kronecker symbol
-            if ECPPHelper.kronecker_symbol(D, p) == 1:
+        # Kiểm tra Kronecker symbol cho cả danh sách trong một lần gọi
+        candidates = [D for D in ECPPHelper.SMALL_DISCRIMINANTS if abs(D) <= max_D]
+        for D, symbol in zip(candidates, kronecker_many(candidates, p)):
+            if symbol == 1:
                 # Thử Cornacchia
                 result = ECPPUtils.cornacchia(D, p)
                 if result is not None:
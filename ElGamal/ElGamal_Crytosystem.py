@@ -5,7 +5,7 @@ from gmpy2 import mpz
 
 from NumberTheory import moduloPower, part_primitive_root, modulo, inverseModulo
 from Prime_All import generate_prime_bit
-from SubDef.String_Int import text_to_int, int_to_text
+from SubDef.String_Int import text_to_int, int_to_text, iter_blocks, blocks_to_text
 
 
 def get_input_by_key(file_name):
@@ -56,6 +56,8 @@ def ElGamal_encrypt(x, k, alpha = None, beta = None, p = None,
         beta = mpz(data["beta"])
     if p is None:
         p = mpz(data["p"])
+    if x >= p:
+        raise ValueError("Thông điệp dài hơn modulo p, dùng ElGamal_encrypt_blocks")
 
     y1 = mpz(moduloPower(alpha, k, p))
     y2 = mpz(moduloPower(x * moduloPower(beta, k, p), 1, p))
@@ -93,6 +95,17 @@ def ElGamal_decrypt(y1 = None, y2 = None, a = None, p = None,
         print("File dell tồn tại!")
     return dk
 
+def ElGamal_encrypt_blocks(message, alpha, beta, p):
+    """Mã hóa thông điệp dài tùy ý: generator các cặp (y1, y2) cho từng khối
+        Mỗi khối dùng một k ngẫu nhiên riêng"""
+    for block in iter_blocks(message, p):
+        k = random.randint(2, p - 2)
+        yield mpz(moduloPower(alpha, k, p)), mpz(modulo(block * moduloPower(beta, k, p), p))
+
+def ElGamal_decrypt_blocks(cypher_blocks, a, p):
+    """Giải mã dãy cặp (y1, y2) của ElGamal_encrypt_blocks về chuỗi ban đầu"""
+    return blocks_to_text(modulo(y2 * moduloPower(y1, p - a - 1, p), p) for y1, y2 in cypher_blocks)
+
 def ElGamal_sign(x = None, k = None, a = None, alpha = None, p = None,
                  input_file = "ElGamal_information.txt",
                  message = "./ElGamal_Signature_Scheme/message.txt",
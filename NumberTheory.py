@@ -1,13 +1,18 @@
+import functools
 import math
 import multiprocessing
+import random
 
 import gmpy2
 import numpy as np
 from gmpy2 import mpz
 
-from SubDef.SD_Primitive_Root import find_primitive_root
+from Performance import instrument
+from SubDef.SD_Perfect_Power import perfect_power
+from SubDef.SD_Primitive_Root import factorize, find_primitive_root, iter_primitive_roots
 
 
+@instrument()
 def gcd(a, b):
     """Tìm ước chung lớn nhất của 2 số a và b"""
     if a > 2**128 or b > 2**128:
@@ -24,6 +29,7 @@ def modulo(number, mod):
         mod = mpz(mod)
     return number % mod
 
+@instrument()
 def moduloPower(number, power, mod):
     """Tính modulo của number lũy thừa power
         Hay tính a^b mod m"""
@@ -32,6 +38,7 @@ def moduloPower(number, power, mod):
     else:
         return pow(number, power, mod)
 
+@instrument()
 def inverseModulo(a, mod):
     """Tìm nghịch đảo của a theo modulo mod
         Hay tìm x để a * x = 1 (mod m)
@@ -41,40 +48,577 @@ def inverseModulo(a, mod):
     else:
         return pow(a, -1, mod)
 
+def inverseModuloBatch(values, mod):
+    """Nghịch đảo đồng thời nhiều số theo modulo mod chỉ với một phép inverseModulo
+        (thủ thuật Montgomery: nghịch đảo tích rồi tách ngược). Phần tử 0 cho kết quả 0"""
+    prefix = [1] * len(values)
+    acc = 1
+    for i, v in enumerate(values):
+        prefix[i] = acc
+        if v % mod:
+            acc = acc * v % mod
+    inv = inverseModulo(acc, mod)
+    res = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        if values[i] % mod:
+            res[i] = prefix[i] * inv % mod
+            inv = inv * values[i] % mod
+    return res
+
 
 def linearCongruence(a, b, m):
-    """Giải phương trình đồng dư ax = b (mod m)"""
+    """Giải phương trình đồng dư ax = b (mod m)
+        Trả về mảng (dtype=object) gồm đủ d = gcd(a, m) nghiệm
+        x0 + k * (m / d) với k = 0..d-1, hoặc None nếu d không chia hết b"""
     d = gcd(a, m)
+    if modulo(b, d) != 0:
+        return None
 
     a = a // d
     b = b // d
     m = m // d
 
-    inv = inverseModulo(a, m)
-    if inv is None:
-        return None
+    x0 = modulo(b * inverseModulo(modulo(a, m), m), m)
+    return x0 + m * np.arange(int(d), dtype=object)
+
+def linearCongruenceBatch(a_values, b_values, m):
+    """Giải nhiều phương trình a_i * x = b_i (mod m) có chung modulo m
+        Trả về list mảng nghiệm, None ở vị trí phương trình vô nghiệm"""
+    a_values = np.mod(np.asarray(a_values, dtype=object), m)
+    b_values = np.mod(np.asarray(b_values, dtype=object), m)
 
-    x = modulo(b * inv, m)
-    res = np.empty(d, dtype=int)
-    for i in np.arange(d-1):
-        res = np.add(res, x + i * m)
+    d_values = np.frompyfunc(gcd, 2, 1)(a_values, m)
+    solvable = np.mod(b_values, d_values) == 0
+
+    res = [None] * len(a_values)
+    # Gom các phương trình có cùng d để dùng chung m' = m / d và arange(d)
+    for d in set(d_values[solvable]):
+        idx = np.nonzero(solvable & (d_values == d))[0]
+        m_reduced = m // d
+        steps = m_reduced * np.arange(int(d), dtype=object)
+        inv = np.frompyfunc(lambda v: inverseModulo(v, m_reduced), 1, 1)(a_values[idx] // d)
+        x0 = np.mod((b_values[idx] // d) * inv, m_reduced)
+        for i, x in zip(idx, x0):
+            res[i] = x + steps
     return res
 
 def part_primitive_root(p, limit = 50, use_parallel=True):
-    """Tìm căn nguyên thủy của số nguyên tố p"""
-    firstNumber = find_primitive_root(p, use_parallel)
-    res = [firstNumber]
-    n = p - 1
+    """Tìm tối đa limit căn nguyên thủy của số nguyên tố p
+        Các căn nguyên thủy có dạng g^k với g là căn đầu tiên và gcd(k, p - 1) = 1"""
+    factors = factorize(p - 1)
+    firstNumber = find_primitive_root(p, use_parallel, factors)
+    return list(iter_primitive_roots(firstNumber, p, factors, limit))
 
-    for i in range(2, p):
-        if limit == 1:
-            break
-        if gcd(i, n) == 1:
-            res.append(i)
-            limit = limit - 1
+# ==================== Cấp nhân ====================
+
+def euler_phi(m, factorization=None):
+    """Hàm Euler φ(m): số các số trong [1, m] nguyên tố cùng nhau với m
+        factorization: dict {p: e} của m (nếu đã có sẵn)"""
+    if factorization is None:
+        factorization = factorize(m) if m > 1 else {}
+    phi = mpz(1)
+    for p, e in factorization.items():
+        phi *= mpz(p) ** (e - 1) * (p - 1)
+    return phi
+
+def carmichael_lambda(m, factorization=None):
+    """Hàm Carmichael λ(m): số mũ nhỏ nhất để a^λ(m) = 1 (mod m) với mọi a nguyên tố cùng nhau với m
+        factorization: dict {p: e} của m (nếu đã có sẵn)"""
+    if factorization is None:
+        factorization = factorize(m) if m > 1 else {}
+    lam = mpz(1)
+    for p, e in factorization.items():
+        if p == 2 and e >= 3:
+            part = mpz(2) ** (e - 2)
+        else:
+            part = mpz(p) ** (e - 1) * (p - 1)
+        lam = gmpy2.lcm(lam, part)
+    return lam
 
+def _lambdaFactorization(factorization):
+    """Phân tích λ(m) từ phân tích của m: gom các thừa số của p - 1 và p"""
+    res = {}
+    for p, e in factorization.items():
+        if p == 2:
+            parts = {2: e - 2} if e >= 3 else ({2: e - 1} if e == 2 else {})
+        else:
+            parts = dict(factorize(p - 1)) if p > 3 else ({2: 1} if p == 3 else {})
+            if e > 1:
+                parts[p] = parts.get(p, 0) + e - 1
+        for q, k in parts.items():
+            res[q] = max(res.get(q, 0), k)
+    return {q: k for q, k in res.items() if k > 0}
+
+def multiplicative_order(a, m, factorization=None):
+    """Cấp của a trong (Z/mZ)*: số k nhỏ nhất với a^k = 1 (mod m)
+        Bắt đầu từ λ(m) rồi bỏ dần các thừa số nguyên tố q của λ(m) khi a^(t/q) vẫn bằng 1
+        factorization: dict {p: e} của m. Trả về 0 nếu gcd(a, m) != 1"""
+    m = mpz(m)
+    a = mpz(a) % m
+    if m == 1:
+        return 1
+    if gcd(a, m) != 1:
+        return 0
+    if factorization is None:
+        factorization = factorize(m)
+
+    t = carmichael_lambda(m, factorization)
+    for q, e in _lambdaFactorization(factorization).items():
+        for _ in range(e):
+            if gmpy2.powmod(a, t // q, m) != 1:
+                break
+            t //= q
+    return int(t)
+
+_SPF_CACHE = np.zeros(0, dtype=np.int64)
+
+def _spfTable(limit):
+    """Bảng ước nguyên tố nhỏ nhất spf[k] cho k <= limit (được cache, mở rộng khi cần)"""
+    global _SPF_CACHE
+    if len(_SPF_CACHE) > limit:
+        return _SPF_CACHE
+    size = max(limit + 1, 2 * len(_SPF_CACHE))
+    spf = np.arange(size, dtype=np.int64)
+    for p in range(2, math.isqrt(size - 1) + 1):
+        if spf[p] == p:
+            block = spf[p * p::p]
+            np.minimum(block, p, out=block)
+    _SPF_CACHE = spf
+    return spf
+
+def _powmodMany(base, exp, mod):
+    """a^e mod m theo từng phần tử, cả base, exp, mod đều là mảng uint64 (mod < 2^32)"""
+    result = np.ones_like(mod)
+    base = base % mod
+    exp = exp.copy()
+    while exp.any():
+        odd = (exp & np.uint64(1)).astype(bool)
+        result = np.where(odd, result * base % mod, result)
+        base = base * base % mod
+        exp >>= np.uint64(1)
+    return result % mod
+
+def _residuesMany(a, moduli):
+    """a mod m cho cả mảng moduli (uint64, m < 2^32): Horner theo các limb 32 bit của a,
+        mỗi bước là một phép (r * 2^32 + limb) mod m trên cả mảng thay vì một phép mod số lớn mỗi m"""
+    a = mpz(a)
+    if a < 0:
+        return (moduli - _residuesMany(-a, moduli)) % moduli
+    res = np.zeros_like(moduli)
+    data = a.to_bytes((a.bit_length() + 31) // 32 * 4, 'big')
+    for limb in np.frombuffer(data, dtype='>u4').astype(np.uint64):
+        res = ((res << np.uint64(32)) | limb) % moduli
     return res
 
+def carmichael_lambda_many(moduli):
+    """λ(m) cho cả mảng moduli (các số nguyên dương < 2^31), phân tích bằng bảng spf"""
+    moduli = np.asarray(moduli, dtype=np.int64)
+    spf = _spfTable(int(moduli.max()) if moduli.size else 1)
+    lam = np.ones_like(moduli)
+    rem = moduli.copy()
+    while True:
+        active = rem > 1
+        if not active.any():
+            return lam
+        p = np.where(active, spf[rem], 1)
+        pe = np.ones_like(rem)
+        # Tách hết lũy thừa của p khỏi rem
+        div = active
+        while div.any():
+            rem[div] //= p[div]
+            pe[div] *= p[div]
+            div = active & (rem % p == 0)
+        part = np.where(active, pe // p * (p - 1), 1)
+        part = np.where(active & (p == 2) & (pe >= 8), pe // 4, part)
+        lam = np.lcm(lam, part)
+
+def multiplicative_order_many(a, moduli):
+    """Cấp của a theo từng modulo trong mảng moduli (các số < 2^31), dùng cho việc tìm r trong AKS
+        Cùng thuật toán với multiplicative_order nhưng vector hóa: các thừa số nguyên tố của λ
+        được tách bằng bảng spf và mỗi lần thử là một phép lũy thừa trên cả mảng
+        Trả về mảng int64, bằng 0 ở các modulo không nguyên tố cùng nhau với a"""
+    moduli = np.asarray(moduli, dtype=np.int64)
+    residues = _residuesMany(a, moduli.astype(np.uint64)).astype(np.int64)
+    coprime = np.gcd(residues, moduli) == 1
+
+    lam = carmichael_lambda_many(moduli)
+    spf = _spfTable(int(lam.max()) if lam.size else 1)
+    order = lam.copy()
+    rem = np.where(coprime, lam, 1)
+    base, mod = residues.astype(np.uint64), moduli.astype(np.uint64)
+    while True:
+        active = rem > 1
+        if not active.any():
+            break
+        q = np.where(active, spf[rem], 1)
+        rem //= q
+        candidate = order // q
+        hit = active & (_powmodMany(base, candidate.astype(np.uint64), mod) == 1)
+        order = np.where(hit, candidate, order)
+    order[moduli == 1] = 1
+    return np.where(coprime, order, 0)
+
+# ==================== Ký hiệu Jacobi / Kronecker ====================
+
+KRONECKER_SPF_LIMIT = 10 ** 7  # |D| lớn hơn thì kronecker_many tính từng phần tử
+
+def jacobi(a, n):
+    """Ký hiệu Jacobi (a/n) với n lẻ dương (gmpy2.jacobi)"""
+    if n <= 0 or n % 2 == 0:
+        raise ValueError("n phải là số nguyên dương lẻ")
+    return int(gmpy2.jacobi(a, n))
+
+def kronecker(a, n):
+    """Ký hiệu Kronecker (a/n), mở rộng Jacobi cho mọi n (gmpy2.kronecker)"""
+    return int(gmpy2.kronecker(a, n))
+
+def kronecker_many(values, n):
+    """(D/n) cho cả danh sách D với cùng n > 0, trả về mảng int8
+        Ký hiệu nhân tính theo tử số nên chỉ cần (q/n) cho mỗi số nguyên tố q xuất hiện trong
+        các |D| (phân tích bằng bảng spf) và (-1/n) một lần, thay vì một phép tính lớn cho mỗi D"""
+    values = np.asarray(values, dtype=object)
+    n = mpz(n)
+    if n <= 0:
+        raise ValueError("n phải dương")
+    if values.size == 0:
+        return np.zeros(0, dtype=np.int8)
+    largest = max(abs(int(v)) for v in values)
+    if largest > KRONECKER_SPF_LIMIT:
+        return np.array([kronecker(int(v), n) for v in values], dtype=np.int8)
+
+    D = values.astype(np.int64)
+    rem = np.abs(D)
+    result = np.where(D < 0, kronecker(-1, n), 1).astype(np.int8)
+    result[D == 0] = 1 if n == 1 else 0
+    spf = _spfTable(largest)
+    symbols = {}
+    while True:
+        active = rem > 1
+        if not active.any():
+            return result
+        q = spf[rem[active]]
+        primes, index = np.unique(q, return_inverse=True)
+        for prime in primes:
+            if prime not in symbols:
+                symbols[prime] = kronecker(int(prime), n)
+        result[active] *= np.array([symbols[prime] for prime in primes], dtype=np.int8)[index]
+        rem[active] //= q
+
+# ==================== Căn bậc hai modulo ====================
+
+@functools.lru_cache(maxsize=64)
+def _sqrtParams(p):
+    """Tham số Tonelli-Shanks cho p (được cache): p - 1 = Q * 2^S, z không chính phương, c = z^Q"""
+    Q, S = p - 1, 0
+    while Q % 2 == 0:
+        Q, S = Q // 2, S + 1
+    z = mpz(2)
+    while gmpy2.legendre(z, p) != -1:
+        z += 1
+    return Q, S, z, gmpy2.powmod(z, Q, p)
+
+def _tonelliShanks(a, p):
+    """Tonelli-Shanks với (Q, S, z) đã cache, a là số chính phương khác 0"""
+    Q, S, _, c = _sqrtParams(p)
+    M = S
+    t = gmpy2.powmod(a, Q, p)
+    R = gmpy2.powmod(a, (Q + 1) // 2, p)
+    while t != 1:
+        # Tìm i nhỏ nhất sao cho t^(2^i) = 1
+        i, temp = 1, t * t % p
+        while temp != 1:
+            temp, i = temp * temp % p, i + 1
+        b = gmpy2.powmod(c, 1 << (M - i - 1), p)
+        M, c = i, b * b % p
+        t, R = t * c % p, R * b % p
+    return R
+
+def _cipolla(a, p):
+    """Cipolla: (t + w)^((p + 1) / 2) trong F_p[w] / (w^2 - (t^2 - a)), a là số chính phương khác 0"""
+    t = mpz(1)
+    while gmpy2.legendre(t * t - a, p) != -1:
+        t += 1
+    w2 = (t * t - a) % p
+    # (x0 + x1 w) lũy thừa theo bình phương và nhân
+    r0, r1 = mpz(1), mpz(0)
+    b0, b1 = t, mpz(1)
+    e = (p + 1) // 2
+    while e:
+        if e & 1:
+            r0, r1 = (r0 * b0 + r1 * b1 * w2) % p, (r0 * b1 + r1 * b0) % p
+        b0, b1 = (b0 * b0 + b1 * b1 * w2) % p, 2 * b0 * b1 % p
+        e >>= 1
+    return r0
+
+def sqrt_mod(a, p):
+    """Căn bậc hai của a modulo số nguyên tố p, None nếu a không chính phương
+        Chọn thuật toán theo p mod 8: p = 3 (mod 4) lũy thừa (p + 1) / 4,
+        p = 5 (mod 8) phương pháp Atkin (ví dụ 2^255 - 19), p = 1 (mod 8) Tonelli-Shanks
+        với tham số cache theo p, hoặc Cipolla khi 2-adic S lớn"""
+    p = mpz(p)
+    a = mpz(a) % p
+    if a == 0 or p == 2:
+        return a
+    if gmpy2.legendre(a, p) != 1:
+        return None
+    if p % 4 == 3:
+        return gmpy2.powmod(a, (p + 1) // 4, p)
+    if p % 8 == 5:
+        # Atkin: v = (2a)^((p - 5) / 8), i = 2a v^2 (i^2 = -1), r = a v (i - 1)
+        v = gmpy2.powmod(2 * a, (p - 5) // 8, p)
+        i = 2 * a * v * v % p
+        return a * v * (i - 1) % p
+    # Tonelli-Shanks tốn thêm ~S^2 / 4 phép nhân, Cipolla cố định ~3 log p
+    S = _sqrtParams(p)[1]
+    if S * S > 8 * p.bit_length():
+        return _cipolla(a, p)
+    return _tonelliShanks(a, p)
+
+def sqrt_many(values, p):
+    """Căn bậc hai modulo p cho nhiều giá trị (None ở vị trí không chính phương)
+        Với p < 2^32 và p = 3 (mod 4) hoặc 5 (mod 8), lũy thừa được tính trên cả mảng NumPy"""
+    p = mpz(p)
+    values = [mpz(v) % p for v in values]
+    if p >= 2 ** 32 or p % 8 == 1 or p == 2 or not values:
+        return [sqrt_mod(v, p) for v in values]
+
+    square = [v == 0 or gmpy2.legendre(v, p) == 1 for v in values]
+    arr = np.array([int(v) for v in values], dtype=np.uint64)
+    mod = np.full(len(arr), int(p), dtype=np.uint64)
+    if p % 4 == 3:
+        roots = _powmodMany(arr, np.full(len(arr), int((p + 1) // 4), dtype=np.uint64), mod)
+    else:
+        two_a = 2 * arr % mod
+        v = _powmodMany(two_a, np.full(len(arr), int((p - 5) // 8), dtype=np.uint64), mod)
+        i = two_a * v % mod * v % mod
+        roots = arr * v % mod * ((i + mod - 1) % mod) % mod
+    return [mpz(int(r)) if ok else None for r, ok in zip(roots, square)]
+
+# ==================== Logarit rời rạc ====================
+
+BSGS_MAX_ORDER = 2 ** 40   # Nhóm con cấp nguyên tố nhỏ hơn giải bằng BSGS, lớn hơn dùng Pollard rho
+BSGS_CHUNK = 4096          # Số giant step tra bảng cùng lúc
+RHO_PARTITIONS = 32        # Số bước nhân trong r-adding walk
+RHO_DP_PER_TASK = 8        # Số điểm phân biệt một task trả về
+
+_HASH_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _slotHash(keys, bits):
+    """Băm Fibonacci cho mảng khóa uint64, trả về vị trí trong bảng 2^bits ô."""
+    return (keys * _HASH_MULT) >> np.uint64(64 - bits)
+
+
+def _keysOf(values):
+    """Khóa 64 bit thấp của các số nguyên lớn."""
+    return np.array([int(v) & 0xFFFFFFFFFFFFFFFF for v in values], dtype=np.uint64)
+
+
+class _BabyStepTable:
+    """Bảng băm địa chỉ mở (dò tuyến tính) lưu trong hai mảng NumPy:
+        keys (uint64, 64 bit thấp của g^j) và idx (int64, j; -1 là ô trống)"""
+
+    def __init__(self, values):
+        size = len(values)
+        self.bits = max(4, (2 * size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.keys = np.zeros(1 << self.bits, dtype=np.uint64)
+        self.idx = np.full(1 << self.bits, -1, dtype=np.int64)
+
+        keys = _keysOf(values)
+        slots = _slotHash(keys, self.bits).astype(np.int64)
+        pending = np.arange(size, dtype=np.int64)
+        # Chèn theo lô: mỗi vòng mỗi ô trống nhận một phần tử, phần còn lại dò ô kế tiếp
+        while len(pending):
+            s = slots[pending]
+            free = self.idx[s] == -1
+            s_free, first = np.unique(s[free], return_index=True)
+            winners = pending[free][first]
+            self.keys[s_free] = keys[winners]
+            self.idx[s_free] = winners
+            placed = np.zeros(size, dtype=np.bool_)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slots[pending] = (slots[pending] + 1) & self.mask
+
+    def lookup(self, values):
+        """Tra nhiều giá trị cùng lúc; trả về mảng các danh sách j ứng viên (khớp 64 bit thấp)."""
+        keys = _keysOf(values)
+        slots = _slotHash(keys, self.bits).astype(np.int64)
+        found = [[] for _ in values]
+        active = np.arange(len(values), dtype=np.int64)
+        while len(active):
+            s = slots[active]
+            occupied = self.idx[s] != -1
+            match = occupied & (self.keys[s] == keys[active])
+            for i, j in zip(active[match], self.idx[s[match]]):
+                found[i].append(int(j))
+            active = active[occupied]
+            slots[active] = (slots[active] + 1) & self.mask
+        return found
+
+
+def babyStepGiantStep(g, h, p, order):
+    """Tìm x trong [0, order) với g^x = h (mod p) bằng baby-step giant-step
+        Trả về None nếu không có nghiệm"""
+    g, h, p = mpz(g), mpz(h) % p, mpz(p)
+    m = int(gmpy2.isqrt(order - 1)) + 1
+
+    baby = [mpz(1)] * m
+    for j in range(1, m):
+        baby[j] = baby[j - 1] * g % p
+    table = _BabyStepTable(baby)
+
+    # Giant step: h * (g^-m)^i
+    factor = moduloPower(inverseModulo(g, p), m, p)
+    gamma = h
+    for start in range(0, m, BSGS_CHUNK):
+        giants = []
+        for _ in range(min(BSGS_CHUNK, m - start)):
+            giants.append(gamma)
+            gamma = gamma * factor % p
+        for i, candidates in enumerate(table.lookup(giants)):
+            for j in candidates:
+                if baby[j] == giants[i]:  # Loại trùng khóa 64 bit
+                    return ((start + i) * m + j) % order
+    return None
+
+
+# Trạng thái dùng chung của worker Pollard rho, gửi một lần qua initializer
+_rho_state = None
+
+
+def _initRhoWorker(g, h, p, order, seed):
+    """Initializer: dựng bảng bước nhân M_i = g^a_i h^b_i dùng chung cho mọi walk."""
+    global _rho_state
+    g, h, p = mpz(g), mpz(h), mpz(p)
+    rng = random.Random(seed)
+    steps = []
+    for _ in range(RHO_PARTITIONS):
+        a, b = rng.randrange(order), rng.randrange(order)
+        steps.append((moduloPower(g, a, p) * moduloPower(h, b, p) % p, a, b))
+    # Điểm phân biệt: khoảng 1 / 2^dp_bits số điểm, cỡ sqrt(order) / 2^dp_bits điểm cần thu
+    dp_bits = max(0, (int(order).bit_length() // 2 - 8) // 2)
+    _rho_state = (g, h, p, order, steps, (1 << dp_bits) - 1)
+
+
+def _rhoWalk(seed):
+    """Worker: đi các walk ngẫu nhiên, trả về RHO_DP_PER_TASK điểm phân biệt (x, a, b)."""
+    g, h, p, order, steps, dp_mask = _rho_state
+    rng = random.Random(seed)
+    max_len = 20 * (dp_mask + 1)
+    points = []
+    while len(points) < RHO_DP_PER_TASK:
+        a, b = rng.randrange(order), rng.randrange(order)
+        x = moduloPower(g, a, p) * moduloPower(h, b, p) % p
+        for _ in range(max_len):
+            if (x >> 5) & dp_mask == 0:
+                points.append((x, a, b))
+                break
+            mult, da, db = steps[x & (RHO_PARTITIONS - 1)]
+            x = x * mult % p
+            a = (a + da) % order
+            b = (b + db) % order
+    return points
+
+
+def pollardRhoLog(g, h, p, order, use_parallel=True):
+    """Tìm x với g^x = h (mod p) trong nhóm con cấp nguyên tố order bằng Pollard rho
+        (r-adding walk, điểm phân biệt, các walk chạy song song trên nhiều process)"""
+    order = int(order)
+    seed = random.getrandbits(64)
+    seeds = iter(lambda: random.getrandbits(64), None)
+    table = {}
+    pool = None
+    try:
+        if use_parallel:
+            pool = multiprocessing.Pool(multiprocessing.cpu_count(), initializer=_initRhoWorker,
+                                        initargs=(g, h, p, order, seed))
+            batches = pool.imap_unordered(_rhoWalk, seeds)
+        else:
+            _initRhoWorker(g, h, p, order, seed)
+            batches = map(_rhoWalk, seeds)
+
+        for batch in batches:
+            for x, a, b in batch:
+                if x not in table:
+                    table[x] = (a, b)
+                    continue
+                a2, b2 = table[x]
+                # g^a h^b = g^a2 h^b2  =>  x (b2 - b) = a - a2
+                if (b2 - b) % order == 0:
+                    continue
+                return (a - a2) * inverseModulo((b2 - b) % order, order) % order
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def _primeOrderLog(g, h, p, q, use_parallel):
+    """Logarit trong nhóm con cấp nguyên tố q: BSGS khi q nhỏ, Pollard rho khi q lớn."""
+    if h == 1:
+        return 0
+    if q <= BSGS_MAX_ORDER:
+        return babyStepGiantStep(g, h, p, q)
+    return pollardRhoLog(g, h, p, q, use_parallel)
+
+
+def pohligHellman(g, h, p, order, factorization, use_parallel=True):
+    """Pohlig-Hellman: quy bài toán về các nhóm con cấp q^e rồi ghép bằng CRT
+        factorization: dict {q: e} của order. Trả về None nếu không có nghiệm"""
+    g, h, p = mpz(g), mpz(h), mpz(p)
+    x, modulus = mpz(0), mpz(1)
+    for q, e in factorization.items():
+        q = mpz(q)
+        qe = q ** e
+        cofactor = order // qe
+        g_q = moduloPower(g, cofactor, p)
+        h_q = moduloPower(h, cofactor, p)
+        # gamma có cấp q; tìm từng chữ số cơ số q của x mod q^e
+        gamma = moduloPower(g_q, q ** (e - 1), p)
+        g_q_inv = inverseModulo(g_q, p)
+        x_q = mpz(0)
+        for k in range(e):
+            target = moduloPower(h_q * moduloPower(g_q_inv, x_q, p) % p, q ** (e - 1 - k), p)
+            digit = _primeOrderLog(gamma, target, p, q, use_parallel)
+            if digit is None:
+                return None
+            x_q += digit * q ** k
+        # CRT: x = x_q (mod q^e)
+        x += modulus * ((x_q - x) * inverseModulo(modulus % qe, qe) % qe)
+        modulus *= qe
+    return x % order
+
+
+def discreteLog(g, h, p, order=None, factorization=None, use_parallel=True):
+    """Tìm x với g^x = h (mod p), p nguyên tố
+        order: cấp của nhóm chứa g (mặc định p - 1), factorization: dict {q: e} của order
+        Tự chọn chiến lược: Pohlig-Hellman theo phân tích của order, mỗi nhóm con
+        cấp nguyên tố giải bằng BSGS (nhỏ) hoặc Pollard rho song song (lớn)
+        Trả về None nếu h không thuộc nhóm sinh bởi g"""
+    p = mpz(p)
+    g, h = mpz(g) % p, mpz(h) % p
+    if order is None:
+        order = p - 1
+    if factorization is None:
+        factorization = factorize(order)
+    # g có thể chỉ sinh một nhóm con thật sự: thu order về đúng cấp của g để Pohlig-Hellman ghép đúng
+    factorization = dict(factorization)
+    for q in list(factorization):
+        while factorization[q] and moduloPower(g, order // q, p) == 1:
+            order //= q
+            factorization[q] -= 1
+        if not factorization[q]:
+            del factorization[q]
+
+    if len(factorization) == 1 and next(iter(factorization.values())) == 1:
+        x = _primeOrderLog(g, h, p, mpz(order), use_parallel)
+    else:
+        x = pohligHellman(g, h, p, order, factorization, use_parallel)
+    if x is None or moduloPower(g, x, p) != h:
+        return None
+    return x
+
 if __name__ == "__main__":
     multiprocessing.set_start_method('spawn', force=True)
     multiprocessing.freeze_support()
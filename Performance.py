@@ -1,9 +1,107 @@
-import NumberTheory
-import cProfile
-
-# Profile func1
-profiler = cProfile.Profile()
-profiler.enable()
-NumberTheory.primitiveRoot(117809)
-profiler.disable()
-profiler.print_stats(sort='time')  # In kết quả, sort theo thời gian
+import contextlib
+import functools
+import os
+import time
+
+"""
+Đo đếm các phép toán nóng (modexp, nghịch đảo, gcd, cộng/nhân điểm, kiểm tra nguyên tố)
+- Chỉ bật khi biến môi trường MM_ATTT_PROFILE được đặt (khác rỗng và khác "0") trước khi import
+- Khi tắt, @instrument trả về nguyên hàm gốc nên không tốn chi phí nào
+- with profile() as report: ... -> report chứa số lần gọi và thời gian cộng dồn của từng phép
+- Chỉ đếm trong process hiện tại (không gồm các worker của multiprocessing)
+"""
+
+ENABLED = os.environ.get("MM_ATTT_PROFILE", "") not in ("", "0")
+
+# name -> [số lần gọi, thời gian cộng dồn (giây)]
+_counters = {}
+
+
+def instrument(name=None, split=None):
+    """
+    Decorator đếm số lần gọi và thời gian của hàm.
+
+    Args:
+        name: tên hiển thị (mặc định module.qualname)
+        split: hàm (*args) -> hậu tố để tách loại lời gọi, ví dụ "add" / "double"
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+        base = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = f"{base}.{split(*args)}" if split is not None else base
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry = _counters.get(key)
+                if entry is None:
+                    entry = _counters[key] = [0, 0.0]
+                entry[0] += 1
+                entry[1] += time.perf_counter() - start
+        return wrapper
+    return decorate
+
+
+class Report:
+    """Kết quả đo của một khối profile(): số lần gọi và thời gian (giây) theo từng phép"""
+
+    def __init__(self):
+        self.calls = {}
+        self.time = {}
+        self.wall = 0.0
+
+    def as_dict(self):
+        """{name: (số lần gọi, thời gian)}"""
+        return {key: (self.calls[key], self.time[key]) for key in self.calls}
+
+    def __str__(self):
+        if not ENABLED:
+            return "Instrumentation đang tắt (đặt MM_ATTT_PROFILE=1 trước khi import)"
+        lines = [f"{'Phép toán':<55}{'Số lần':>12}{'Thời gian (s)':>16}"]
+        for key in sorted(self.calls, key=lambda k: -self.time[k]):
+            lines.append(f"{key:<55}{self.calls[key]:>12,}{self.time[key]:>16.6f}")
+        lines.append(f"{'Tổng thời gian khối':<55}{'':>12}{self.wall:>16.6f}")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile():
+    """Context manager: đo các phép toán được gọi bên trong khối with"""
+    report = Report()
+    before = {key: tuple(value) for key, value in _counters.items()}
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.wall = time.perf_counter() - start
+        for key, (calls, seconds) in _counters.items():
+            old_calls, old_seconds = before.get(key, (0, 0.0))
+            if calls != old_calls:
+                report.calls[key] = calls - old_calls
+                report.time[key] = seconds - old_seconds
+
+
+def reset():
+    """Xóa toàn bộ bộ đếm"""
+    _counters.clear()
+
+
+if __name__ == "__main__":
+    # Bật đo đếm rồi mới import các module được đo (module Performance được import lại dưới tên riêng)
+    os.environ.setdefault("MM_ATTT_PROFILE", "1")
+    import Performance
+    import NumberTheory
+
+    from ECC.Elliptic_Curve import EllipticCurve
+    from Prime_All import generate_prime_bit
+
+    with Performance.profile() as report:
+        NumberTheory.part_primitive_root(117809, use_parallel=False)
+        p = generate_prime_bit(128)
+        curve = EllipticCurve(2, 3, p)
+        curve.point_multiply(p // 3, curve.generate_point())
+    print(report)
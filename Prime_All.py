@@ -7,6 +7,8 @@ import gmpy2
 import numpy as np
 from gmpy2 import mpz, random_state, mpz_random
 
+from Performance import instrument
+
 """
 Sàng nguyên tố. Trả về dãy các số nguyên tố nhỏ hơn n sd khi nhỏ hơn 32 bit
 """
@@ -204,6 +206,7 @@ def miller_rabin_pure(n):
 
 
 """Kiểm tra số nguyên tố - Chia case"""
+@instrument()
 def prime_check(n):
     if n < 2 ** 128:  # Small/medium: Pure Python
         if is_divisible_by_small_primes(n):
@@ -3,7 +3,7 @@ from gmpy2 import mpz
 
 from Prime_All import generate_prime_bit, generate_prime_in_range
 from NumberTheory import moduloPower, inverseModulo, gcd
-from SubDef.String_Int import text_to_int, int_to_text
+from SubDef.String_Int import text_to_int, int_to_text, iter_blocks, blocks_to_text
 
 
 def get_input_by_key(file_name):
@@ -63,6 +63,8 @@ def RSA_encrypt(x, n = None, e = None, input_file = "RSA_information.txt",
         n = mpz(data["n"])
     if e is None:
         e = mpz(data["e"])
+    if x >= n:
+        raise ValueError("Thông điệp dài hơn modulo n, dùng RSA_encrypt_blocks")
 
     result = moduloPower(x, e, n)
 
@@ -95,6 +97,15 @@ def RSA_decrypt(y = None, n = None, d = None, input_file = "RSA_information.txt"
 
     return result
 
+def RSA_encrypt_blocks(message, n, e):
+    """Mã hóa thông điệp dài tùy ý: generator các bản mã của từng khối (xem iter_blocks)"""
+    for block in iter_blocks(message, n):
+        yield moduloPower(block, e, n)
+
+def RSA_decrypt_blocks(cypher_blocks, n, d):
+    """Giải mã dãy bản mã của RSA_encrypt_blocks về chuỗi ban đầu"""
+    return blocks_to_text(moduloPower(mpz(y), d, n) for y in cypher_blocks)
+
 def RSA_sign(x = None, n = None, d = None, input_file = "RSA_information.txt",
              message = "./RSA_Signature_Scheme/message.txt",
              output_file = "./RSA_Signature_Scheme/RSA_signed.txt"):
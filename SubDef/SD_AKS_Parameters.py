@@ -0,0 +1,164 @@
+import math
+
+import gmpy2
+import numpy as np
+from gmpy2 import mpz
+
+from NumberTheory import carmichael_lambda_many, euler_phi, multiplicative_order, multiplicative_order_many
+from SubDef.SD_Primitive_Root import factorize
+
+"""
+Chọn tham số r cho AKS: r nhỏ nhất sao cho ord_r(n) > bound (mặc định log2(n)^2)
+- Duyệt r theo khối, khối sau gấp đôi khối trước, mỗi khối xử lý bằng NumPy
+- n mod r cho cả khối: Horner theo limb 32 bit (multiplicative_order_many)
+- Loại trước các r có λ(r) <= bound (cấp luôn chia hết λ(r)) rồi mới tính cấp
+- Không có r nào <= bound + 1 thỏa mãn vì ord_r(n) < r, nên bắt đầu ngay sau bound
+
+Số giá trị a cần kiểm tra ở bước 5 (congruence_limit)
+- "classic": ⌊sqrt(φ(r)) log2 n⌋ của bản AKS cuối (dùng φ(r), không phải r)
+- "exact": ℓ nhỏ nhất để C(t + ℓ, t - 1) > n^sqrt(t) với mọi cấp t có thể của nhóm
+  sinh bởi n, p trong (Z/r)^* (ord_r(n) | t | φ(r)), đúng lập luận đếm của AKS
+  theo cách trình bày của Lenstra-Pomerance và Bernstein, không bao giờ lớn hơn "classic"
+
+Tiến độ: các hàm AKS nhận progress(event) với event là dict (progress_event, congruence_event)
+"""
+
+FIRST_BLOCK = 256
+BOUND_METHODS = ("exact", "classic")
+
+
+def _log2(n):
+    """log2(n) dạng float cho n lớn tùy ý (math.log2 của int quá lớn sẽ tràn)"""
+    n = mpz(n)
+    shift = max(n.bit_length() - 64, 0)
+    return math.log2(int(n >> shift)) + shift
+
+
+def order_bound(n):
+    """Cận log2(n)^2 mà cấp của n modulo r phải vượt qua"""
+    return _log2(n) ** 2
+
+
+def find_r(n, bound=None, limit=None):
+    """
+    r nhỏ nhất với ord_r(n) > bound (các r chia hết n có cấp 0 nên tự bị loại).
+
+    Args:
+        n: số cần kiểm tra (n > 1)
+        bound: cận của cấp, mặc định order_bound(n)
+        limit: r lớn nhất được xét, trả về limit + 1 nếu không tìm thấy (mặc định không giới hạn)
+
+    Returns:
+        r (int)
+    """
+    if bound is None:
+        bound = order_bound(n)
+    start, size = int(bound) + 2, FIRST_BLOCK
+    while limit is None or start <= limit:
+        stop = start + size if limit is None else min(start + size, limit + 1)
+        candidates = np.arange(start, stop, dtype=np.int64)
+        candidates = candidates[carmichael_lambda_many(candidates) > bound]
+        if len(candidates):
+            good = np.nonzero(multiplicative_order_many(n, candidates) > bound)[0]
+            if len(good):
+                return int(candidates[good[0]])
+        start, size = stop, 2 * size
+    return limit + 1
+
+
+# ==================== Số giá trị a của bước 5 ====================
+
+def _log_binomial(m, k):
+    """ln C(m, k) bằng lgamma"""
+    return math.lgamma(m + 1) - math.lgamma(k + 1) - math.lgamma(m - k + 1)
+
+
+def _divisors(factorization):
+    """Mọi ước dương từ dict {p: e}"""
+    divisors = [1]
+    for p, e in factorization.items():
+        divisors = [d * p ** i for d in divisors for i in range(e + 1)]
+    return divisors
+
+
+def congruence_limit(n, r, method="exact"):
+    """
+    Số giá trị a (kiểm tra a = 1..ℓ) đủ để bước 5 của AKS chứng minh n nguyên tố với r đã chọn.
+
+    Args:
+        method: "exact" (cận đếm chặt) hoặc "classic" (⌊sqrt(φ(r)) log2 n⌋)
+    """
+    if method not in BOUND_METHODS:
+        raise ValueError(f"method phải là một trong {BOUND_METHODS}")
+    n, r = mpz(n), int(r)
+    phi = int(euler_phi(r, factorize(r) if r > 1 else {}))
+    classic = int(math.sqrt(phi) * _log2(n))
+    if method == "classic":
+        return classic
+
+    order = int(multiplicative_order(n, r))
+    if order == 0:
+        raise ValueError("n và r phải nguyên tố cùng nhau")
+    log_n = math.log(2) * _log2(n)
+    limit = 0
+    # t = |<n, p>| chưa biết: chỉ biết ord_r(n) | t | φ(r), lấy ℓ đủ cho mọi t như vậy
+    for d in _divisors(factorize(phi // order) if phi // order > 1 else {}):
+        t = order * d
+        need = math.sqrt(t) * log_n
+        lo, hi = limit, classic
+        if _log_binomial(t + hi, t - 1) <= need:
+            return classic
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _log_binomial(t + mid, t - 1) > need:
+                hi = mid
+            else:
+                lo = mid + 1
+        limit = lo
+    return min(limit, classic)
+
+
+def estimate_bit_operations(n, r, limit_a):
+    """
+    Ước lượng số phép toán bit của bước 5: limit_a lần lũy thừa (x + a)^n, mỗi lần khoảng
+    1.5 log2 n phép nhân đa thức, mỗi phép nhân là một tích số nguyên r ô (thế Kronecker)
+    có giá M(b) = b log2 b log2 log2 b
+    """
+    log2n = mpz(n).bit_length()
+    b = r * (2 * log2n + max(int(r).bit_length(), 1))
+    mul = b * math.log2(b) * max(math.log2(math.log2(b)), 1.0)
+    return limit_a * 1.5 * log2n * mul
+
+
+def aks_parameters(n, method="exact"):
+    """(r, limit_a, số phép toán bit ước lượng) của AKS cho n, để chọn giữa AKS và ECPP trước khi chạy"""
+    r = find_r(n)
+    limit_a = congruence_limit(n, r, method) if mpz(n) > r else 0
+    return r, limit_a, estimate_bit_operations(n, r, limit_a)
+
+
+# ==================== Sự kiện tiến độ ====================
+
+def multiplies_per_witness(n):
+    """Số phép nhân đa thức cho một giá trị a: một bình phương mỗi bit của n, một lần nhân (x + a) mỗi bit 1"""
+    n = mpz(n)
+    return n.bit_length() + gmpy2.popcount(n)
+
+
+def progress_event(phase, n, **fields):
+    """Sự kiện tiến độ dạng dict: phase (perfect_power, find_r, gcd, congruence, done), n và các trường thêm"""
+    event = {"phase": phase, "n": int(n)}
+    event.update(fields)
+    return event
+
+
+def congruence_event(n, r, done, limit_a, elapsed, checked=None):
+    """
+    Sự kiện của bước 5: số a đã kiểm tra, số phép nhân đa thức đã làm và ETA (giây)
+    tính theo tốc độ của các a kiểm tra trong lần chạy này (checked, mặc định bằng done)
+    """
+    checked = done if checked is None else checked
+    rate = checked / elapsed if elapsed > 0 else 0.0
+    eta = (limit_a - done) / rate if rate > 0 else None
+    return progress_event("congruence", n, r=int(r), a=done, limit_a=limit_a,
+                          multiplies=done * multiplies_per_witness(n), elapsed=elapsed, rate=rate, eta=eta)
@@ -0,0 +1,197 @@
+from functools import lru_cache
+from random import randint
+import multiprocessing as mp
+
+import gmpy2
+import numpy as np
+from gmpy2 import mpz
+
+from Prime_All import SMALL_PRIMES, SMALL_PRIME_LIMIT, simple_sieve
+
+"""
+Phân tích thừa số bằng đường cong Elliptic (Lenstra ECM)
+- Đường cong Montgomery By^2 = x^3 + Ax^2 + x, chỉ dùng tọa độ (X : Z)
+- Tham số hóa Suyama, stage 1 bằng Montgomery ladder với số mũ k = prod p^e <= B1
+- Stage 2 kiểu baby-step/giant-step cho các số nguyên tố trong (B1, B2]
+"""
+
+# Lịch tăng dần (B1, số đường cong) khi không biết trước kích thước thừa số
+ECM_SCHEDULE = [(2000, 25), (11000, 90), (50000, 300), (250000, 700)]
+STAGE2_D = 210  # Bước giant-step, chia hết cho 2*3*5*7
+
+
+@lru_cache(maxsize=8)
+def primes_upto(limit):
+    """Danh sách số nguyên tố <= limit (dùng bảng SMALL_PRIMES khi đủ)."""
+    if limit <= SMALL_PRIME_LIMIT:
+        return SMALL_PRIMES[:int(np.searchsorted(SMALL_PRIMES, limit, side='right'))]
+    return simple_sieve(limit)
+
+
+@lru_cache(maxsize=8)
+def stage1_exponent(B1):
+    """Số mũ stage 1: tích mọi lũy thừa nguyên tố p^e <= B1 (được cache theo B1)."""
+    k = mpz(1)
+    for p in primes_upto(B1):
+        pe = p
+        while pe * p <= B1:
+            pe *= p
+        k *= pe
+    return k
+
+
+def _xdbl(X, Z, a24, n):
+    """Nhân đôi điểm (X : Z) trên đường cong Montgomery."""
+    s = (X + Z) * (X + Z) % n
+    d = (X - Z) * (X - Z) % n
+    t = s - d
+    return s * d % n, t * (d + a24 * t) % n
+
+
+def _xadd(XP, ZP, XQ, ZQ, Xdiff, Zdiff, n):
+    """Cộng vi phân P + Q khi biết P - Q."""
+    u = (XP - ZP) * (XQ + ZQ)
+    v = (XP + ZP) * (XQ - ZQ)
+    s = u + v
+    d = u - v
+    return Zdiff * s * s % n, Xdiff * d * d % n
+
+
+def _ladder(k, X, Z, a24, n):
+    """Montgomery ladder: tính k * (X : Z)."""
+    if k == 1:
+        return X, Z
+    X0, Z0 = X, Z
+    X1, Z1 = _xdbl(X, Z, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == '1':
+            X0, Z0 = _xadd(X1, Z1, X0, Z0, X, Z, n)
+            X1, Z1 = _xdbl(X1, Z1, a24, n)
+        else:
+            X1, Z1 = _xadd(X1, Z1, X0, Z0, X, Z, n)
+            X0, Z0 = _xdbl(X0, Z0, a24, n)
+    return X0, Z0
+
+
+def _suyama_curve(n, sigma):
+    """Tham số hóa Suyama: trả về (X0, Z0, a24) hoặc một ước của n nếu gặp phép nghịch đảo hỏng."""
+    u = (sigma * sigma - 5) % n
+    v = 4 * sigma % n
+    X0 = gmpy2.powmod(u, 3, n)
+    Z0 = gmpy2.powmod(v, 3, n)
+    # a24 = (A + 2) / 4 = (v - u)^3 (3u + v) / (16 u^3 v)
+    num = gmpy2.powmod(v - u, 3, n) * (3 * u + v) % n
+    den = 16 * X0 * v % n
+    g = gmpy2.gcd(den, n)
+    if g != 1:
+        return g
+    return X0, Z0, num * gmpy2.invert(den, n) % n
+
+
+def _stage2(X, Z, a24, n, B1, B2):
+    """Stage 2 baby-step/giant-step: tích các X_R Z_d - X_d Z_R với q = mD +- d nguyên tố."""
+    D = STAGE2_D
+    primes = primes_upto(B2)
+    is_prime = np.zeros(B2 + D + 1, dtype=np.bool_)
+    is_prime[primes] = True
+    is_prime[:B1 + 1] = False
+
+    # Baby steps: d*Q với d < D/2, gcd(d, D) = 1
+    baby = [(d,) + _ladder(d, X, Z, a24, n) for d in range(1, D // 2, 2) if gmpy2.gcd(d, D) == 1]
+
+    # Giant steps: R_m = m*D*Q, đi bằng cộng vi phân R_{m+1} = R_m + DQ (hiệu R_{m-1})
+    XD, ZD = _ladder(D, X, Z, a24, n)
+    m = max(B1 // D, 1)
+    XR, ZR = _ladder(m * D, X, Z, a24, n)
+    if m == 1:
+        XRp, ZRp = X, Z  # Chưa có R_0 = O: bước m = 1 -> 2 là phép nhân đôi
+    else:
+        XRp, ZRp = _ladder((m - 1) * D, X, Z, a24, n)
+
+    acc = mpz(1)
+    while m * D - D // 2 <= B2:
+        base = m * D
+        for d, Xd, Zd in baby:
+            if is_prime[base + d] or is_prime[base - d]:
+                acc = acc * (XR * Zd - Xd * ZR) % n
+        if m == 1:
+            XN, ZN = _xdbl(XR, ZR, a24, n)
+        else:
+            XN, ZN = _xadd(XR, ZR, XD, ZD, XRp, ZRp, n)
+        XRp, ZRp, XR, ZR = XR, ZR, XN, ZN
+        m += 1
+    return gmpy2.gcd(acc, n)
+
+
+def ecm_one_curve(n, sigma, B1, B2=None):
+    """Chạy ECM trên một đường cong Suyama(sigma). Trả về ước không tầm thường hoặc None."""
+    n = mpz(n)
+    if B2 is None:
+        B2 = 100 * B1
+    curve = _suyama_curve(n, mpz(sigma))
+    if not isinstance(curve, tuple):
+        return curve if curve != n else None
+    X, Z, a24 = curve
+
+    # Stage 1
+    X, Z = _ladder(stage1_exponent(B1), X, Z, a24, n)
+    g = gmpy2.gcd(Z, n)
+    if g == n:
+        return None
+    if g != 1:
+        return g
+
+    # Stage 2
+    if B2 > B1:
+        g = _stage2(X, Z, a24, n, B1, B2)
+        if 1 < g < n:
+            return g
+    return None
+
+
+# Trạng thái dùng chung của worker, gửi một lần qua initializer
+_worker_args = None
+
+
+def _init_worker(n, B1, B2):
+    """Initializer cho Pool: lưu n, B1, B2 trong mỗi worker."""
+    global _worker_args
+    _worker_args = (mpz(n), B1, B2)
+
+
+def _curve_worker(sigma):
+    """Worker: chạy một đường cong với sigma cho trước."""
+    n, B1, B2 = _worker_args
+    return ecm_one_curve(n, sigma, B1, B2)
+
+
+def ecm_factor(n, B1=None, B2=None, curves=None, use_parallel=True, schedule=None):
+    """
+    Tìm một ước không tầm thường của hợp số n bằng ECM.
+    Nếu không chỉ định B1 thì tăng dần theo schedule (mặc định ECM_SCHEDULE).
+    Các đường cong độc lập nên được chia cho các process, dừng ngay khi có kết quả.
+    Trả về ước tìm được hoặc None.
+    """
+    n = mpz(n)
+    if gmpy2.is_even(n):
+        return mpz(2)
+    if B1 is None:
+        schedule = schedule or ECM_SCHEDULE
+    else:
+        schedule = [(B1, curves if curves is not None else ECM_SCHEDULE[0][1])]
+
+    for B1, num_curves in schedule:
+        stage2 = B2 if B2 is not None else 100 * B1
+        sigmas = (randint(6, 2 ** 62) for _ in range(num_curves))
+        if use_parallel:
+            with mp.Pool(mp.cpu_count(), initializer=_init_worker, initargs=(n, B1, stage2)) as pool:
+                for res in pool.imap_unordered(_curve_worker, sigmas):
+                    if res is not None:
+                        pool.terminate()  # Hủy các đường cong còn lại
+                        return mpz(res)
+        else:
+            for sigma in sigmas:
+                res = ecm_one_curve(n, sigma, B1, stage2)
+                if res is not None:
+                    return mpz(res)
+    return None
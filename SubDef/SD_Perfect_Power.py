@@ -0,0 +1,42 @@
+from functools import lru_cache
+
+import gmpy2
+from gmpy2 import mpz
+
+"""
+Nhận diện lũy thừa hoàn hảo n = base^exp (dùng chung cho AKS, ECPP và phân tích thừa số)
+- Chỉ thử số mũ nguyên tố p <= log2(n)
+- Mỗi p được sàng bằng số dư lũy thừa bậc p modulo vài số nguyên tố q = kp + 1 trước khi gọi iroot
+- Tính chính xác trên số nguyên, không dùng số thực
+"""
+
+POWER_FILTERS = 4  # Số modulo q = kp + 1 dùng để sàng mỗi số mũ nguyên tố p trước khi gọi iroot
+
+
+@lru_cache(maxsize=None)
+def _power_residue_filters(p):
+    """Các số nguyên tố q = 1 (mod p) dùng để sàng số mũ p: x != 0 là lũy thừa bậc p mod q khi và chỉ khi
+    x^((q - 1) / p) = 1, chỉ khoảng 1/p số dư thỏa nên mỗi bộ lọc loại được phần lớn các p sai"""
+    filters, q = [], p + 1
+    while len(filters) < POWER_FILTERS:
+        if gmpy2.is_prime(q):
+            filters.append((q, (q - 1) // p))
+        q += p
+    return tuple(filters)
+
+
+def perfect_power(n):
+    """n = base^exp với exp > 1 lớn nhất: trả về (base, exp), hoặc None nếu n không là lũy thừa hoàn hảo
+    Nghiệm tìm được qua iroot lại được phân tích tiếp để exp là lớn nhất"""
+    n = mpz(n)
+    if n < 4:
+        return None
+    p = mpz(2)
+    while p <= n.bit_length():
+        if all(pow(int(n % q), e, q) <= 1 for q, e in _power_residue_filters(int(p))):
+            root, exact = gmpy2.iroot(n, int(p))
+            if exact:
+                inner = perfect_power(root)
+                return (root, int(p)) if inner is None else (inner[0], inner[1] * int(p))
+        p = gmpy2.next_prime(p)
+    return None
@@ -0,0 +1,388 @@
+from functools import lru_cache
+
+import numpy as np
+from gmpy2 import mpz
+
+"""
+Nhân đa thức trong Z_n[x] / (x^r - 1) bằng thế Kronecker (Kronecker substitution)
+- Xếp các hệ số vào một số nguyên lớn, mỗi hệ số một ô đủ rộng (căn theo byte)
+- Một phép nhân gmpy2 (GMP tự dùng FFT khi số lớn) thay cho O(r^2) phép nhân nhỏ
+- Gập x^r = 1 ngay trên số nguyên: cộng nửa cao vào nửa thấp, rồi tách ô và lấy mod n
+- Lũy thừa: cửa sổ trượt cho đa thức bất kỳ, (x + a)^e nhân từng bước bằng dịch vòng O(r)
+- ntt_mul_mod: phương án NumPy cho n < 2^62, NTT theo nhiều số nguyên tố 30 bit rồi ghép CRT
+"""
+
+
+@lru_cache(maxsize=64)
+def slot_bytes(r, n):
+    """Số byte mỗi ô: đủ chứa một hệ số của tích vòng (tối đa r số hạng, mỗi số < n^2)"""
+    bound = r * (n - 1) ** 2
+    return max(1, (bound.bit_length() + 7) // 8)
+
+
+def pack(coeffs, width):
+    """Xếp danh sách hệ số (0 <= c < 256^width) thành một mpz, hệ số bậc 0 ở ô thấp nhất"""
+    return mpz.from_bytes(b''.join(int(c).to_bytes(width, 'little') for c in coeffs), 'little')
+
+
+def unpack(value, count, width, n):
+    """Tách count ô width byte của value, lấy mod n từng hệ số"""
+    data = value.to_bytes(count * width, 'little')
+    return [int.from_bytes(data[i:i + width], 'little') % n for i in range(0, count * width, width)]
+
+
+def _fold(product, r, width):
+    """Gập tích (bậc <= 2r - 2) theo x^r = 1: nửa cao cộng vào nửa thấp, các ô không tràn"""
+    shift = 8 * width * r
+    return (product & ((mpz(1) << shift) - 1)) + (product >> shift)
+
+
+def _reduce(poly, r, n):
+    """Đưa list hệ số về đúng r hệ số trong [0, n) (gập các bậc >= r)"""
+    res = [0] * r
+    for i, c in enumerate(poly):
+        res[i % r] += c
+    return [c % n for c in res]
+
+
+def poly_mul_mod(p1, p2, r, n):
+    """Nhân hai đa thức (list hệ số) modulo (x^r - 1, n), trả về list đủ r hệ số"""
+    r, n = int(r), int(n)  # r, n có thể là mpz, to_bytes chỉ nhận int
+    width = slot_bytes(r, n)
+    a = pack(_reduce(p1, r, n), width)
+    b = a if p2 is p1 else pack(_reduce(p2, r, n), width)
+    return unpack(_fold(a * b, r, width), r, width, n)
+
+
+def poly_sqr_mod(p, r, n):
+    """Bình phương đa thức modulo (x^r - 1, n)"""
+    return poly_mul_mod(p, p, r, n)
+
+
+# ==================== Lũy thừa đa thức ====================
+
+VECTOR_MAX_N = 2 ** 32  # n nhỏ hơn thì hệ số nằm trong uint64 và tách ô / lấy mod bằng NumPy
+WINDOW_THRESHOLDS = (8, 24, 80, 240, 672)  # Số bit của số mũ ứng với cửa sổ rộng 2, 3, ...
+
+
+class _KroneckerRing:
+    """
+    Trạng thái dùng chung cho một chuỗi phép nhân trong Z_n[x] / (x^r - 1) trên một lô
+    gồm batch đa thức (ví dụ nhiều giá trị a của AKS): độ rộng ô và các bộ đệm xếp / tách ô
+    cấp phát một lần, dùng lại ở mọi bước. Với n < 2^32 cả lô là một mảng uint64 (batch, r)
+    và mọi bước tách ô, lấy mod, nhân (x + a) đều vector hóa trên toàn bộ lô
+    """
+
+    def __init__(self, r, n, batch=1):
+        self.r, self.n, self.batch = int(r), int(n), batch
+        self.width = slot_bytes(self.r, self.n)
+        self.vector = self.n < VECTOR_MAX_N
+        if self.vector:
+            self.limbs = (self.width + 3) // 4
+            self.unpack_buf = np.zeros((batch, self.r, 4 * self.limbs), dtype=np.uint8)
+            self.pack_buf = np.zeros((batch, self.r, self.width), dtype=np.uint8)
+            self.shift_buf = np.empty((batch, self.r), dtype=np.uint64)
+            self.n64 = np.uint64(self.n)
+
+    def coeffs(self, polys):
+        """Danh sách đa thức (list hệ số bất kỳ) -> dạng làm việc: mỗi đa thức r hệ số trong [0, n)"""
+        res = [_reduce(poly, self.r, self.n) for poly in polys]
+        return np.array(res, dtype=np.uint64).reshape(len(res), self.r) if self.vector else res
+
+    def to_lists(self, coeffs):
+        return [[int(c) for c in row] for row in coeffs]
+
+    def pack(self, coeffs):
+        """Xếp ô từng đa thức của lô, trả về list mpz"""
+        if not self.vector:
+            return [pack(row, self.width) for row in coeffs]
+        take = min(self.width, 8)
+        count = len(coeffs)
+        view = coeffs.astype('<u8').view(np.uint8).reshape(count, self.r, 8)
+        self.pack_buf[:count, :, :take] = view[:, :, :take]
+        return [mpz.from_bytes(self.pack_buf[i], 'little') for i in range(count)]
+
+    def unpack(self, values):
+        """Tách ô và lấy mod n; với n < 2^32 lấy mod theo Horner trên các limb 32 bit, cả lô một lượt"""
+        if not self.vector:
+            return [unpack(value, self.r, self.width, self.n) for value in values]
+        count = len(values)
+        for i, value in enumerate(values):
+            data = np.frombuffer(value.to_bytes(self.r * self.width, 'little'), dtype=np.uint8)
+            self.unpack_buf[i, :, :self.width] = data.reshape(self.r, self.width)
+        limbs = self.unpack_buf[:count].view('<u4').astype(np.uint64)
+        res = limbs[:, :, -1] % self.n64
+        for j in range(self.limbs - 2, -1, -1):
+            res = ((res << np.uint64(32)) | limbs[:, :, j]) % self.n64
+        return res
+
+    def mul_packed(self, a, b):
+        """Tích từng cặp đa thức đã xếp ô của hai lô, trả về hệ số đã rút gọn"""
+        return self.unpack([_fold(x * y, self.r, self.width) for x, y in zip(a, b)])
+
+    def square(self, coeffs):
+        """Bình phương cả lô"""
+        packed = self.pack(coeffs)
+        return self.mul_packed(packed, packed)
+
+    def mul_linear(self, coeffs, a_values):
+        """Nhân đa thức thứ i với (x + a_i) bằng dịch vòng và cộng, O(r): c'[j] = a_i c[j] + c[j - 1]"""
+        if not self.vector:
+            r, n = self.r, self.n
+            return [[(a * row[j] + row[j - 1]) % n for j in range(r)] for a, row in zip(a_values, coeffs)]
+        shift = self.shift_buf[:len(coeffs)]
+        shift[:, 1:] = coeffs[:, :-1]
+        shift[:, 0] = coeffs[:, -1]
+        coeffs *= np.asarray(a_values, dtype=np.uint64)[:, None]
+        coeffs += shift
+        coeffs %= self.n64
+        return coeffs
+
+
+def _window_size(bits):
+    """Độ rộng cửa sổ trượt theo số bit của số mũ"""
+    return 1 + sum(bits > t for t in WINDOW_THRESHOLDS)
+
+
+def _sliding_windows(e, k):
+    """Chia số mũ (đọc từ bit cao) thành các bước (số lần bình phương, giá trị lẻ cần nhân hoặc 0)"""
+    bits = bin(e)[2:]
+    i, steps = 0, []
+    while i < len(bits):
+        if bits[i] == '0':
+            steps.append((1, 0))
+            i += 1
+            continue
+        j = min(i + k, len(bits))
+        while bits[j - 1] == '0':
+            j -= 1
+        steps.append((j - i, int(bits[i:j], 2)))
+        i = j
+    return steps
+
+
+def poly_pow_mod(poly, e, r, n):
+    """
+    (poly)^e modulo (x^r - 1, n) theo cửa sổ trượt: chỉ lưu sẵn các lũy thừa lẻ poly^1, poly^3, ...
+    nên số phép nhân giảm từ ~log2(e) / 2 xuống ~log2(e) / (k + 1)
+    """
+    ring = _KroneckerRing(r, n)
+    base = ring.coeffs([poly])
+    if e == 0:
+        return [1 % ring.n] + [0] * (ring.r - 1)
+    k = _window_size(e.bit_length())
+    packed_base = ring.pack(base)
+    table = {1: packed_base}
+    if k > 1:
+        square = ring.pack(ring.mul_packed(packed_base, packed_base))
+        for odd in range(3, 1 << k, 2):
+            table[odd] = ring.pack(ring.mul_packed(table[odd - 2], square))
+
+    result = None
+    for squarings, odd in _sliding_windows(e, k):
+        if result is not None:
+            for _ in range(squarings):
+                result = ring.square(result)
+        if not odd:
+            continue
+        if result is None:
+            # Cửa sổ đầu tiên: lấy thẳng từ bảng, không cần nhân
+            result = base if odd == 1 else ring.unpack(table[odd])
+        else:
+            result = ring.mul_packed(ring.pack(result), table[odd])
+    return ring.to_lists(result)[0]
+
+
+def poly_pow_linear_many(a_values, e, r, n):
+    """
+    (x + a)^e modulo (x^r - 1, n) cho cả lô giá trị a, dùng chung một lần duyệt bit của e:
+    mỗi bit là một lượt bình phương cả lô (một tích gmpy2 cho mỗi a, tách ô / lấy mod một lượt NumPy)
+    và nhân với (x + a) bằng dịch vòng O(r), nên cửa sổ trượt không cần thiết ở đây.
+    Trả về list các list r hệ số
+    """
+    a_values = [int(a) % int(n) for a in a_values]
+    ring = _KroneckerRing(r, n, batch=len(a_values))
+    result = ring.coeffs([[1]] * len(a_values))
+    for bit in bin(e)[2:]:
+        result = ring.square(result)
+        if bit == '1':
+            result = ring.mul_linear(result, a_values)
+    return ring.to_lists(result)
+
+
+def poly_pow_linear(a, e, r, n):
+    """(x + a)^e modulo (x^r - 1, n)"""
+    return poly_pow_linear_many([a], e, r, n)[0]
+
+
+def linear_congruence_failures(a_values, n, r):
+    """
+    Các a trong lô không thỏa (x + a)^n = x^n + a mod (x^r - 1, n) (bước 5 của AKS).
+    Vế phải x^(n mod r) + a dùng chung cho cả lô, so sánh một lượt
+    """
+    n, r = int(n), int(r)
+    left = poly_pow_linear_many(a_values, n, r, n)
+    power = n % r
+    failures = []
+    for a, coeffs in zip(a_values, left):
+        expected = [0] * r
+        expected[0] = a % n
+        expected[power] = (expected[power] + 1) % n
+        if coeffs != expected:
+            failures.append(a)
+    return failures
+
+
+# ==================== NTT đa modulo (NumPy) ====================
+
+# Các số nguyên tố 30 bit dạng c * 2^k + 1 (k >= 22): có căn đơn vị bậc 2^22
+NTT_PRIMES = [998244353, 985661441, 943718401, 935329793, 897581057, 880803841, 754974721, 645922817]
+NTT_MAX_LOG = 22
+NTT_MAX_N = 2 ** 62  # Hệ số lưu bằng uint64, phần dư tạm của _mulmod_small cần n < 2^62
+
+
+def _primitive_root(p):
+    """Căn nguyên thủy nhỏ nhất của p (p - 1 = c * 2^k với c nhỏ)"""
+    factors, m, q = set(), p - 1, 2
+    while q * q <= m:
+        while m % q == 0:
+            factors.add(q)
+            m //= q
+        q += 1
+    if m > 1:
+        factors.add(m)
+    g = 2
+    while any(pow(g, (p - 1) // q, p) == 1 for q in factors):
+        g += 1
+    return g
+
+
+@lru_cache(maxsize=32)
+def _ntt_tables(k, log_len):
+    """Bảng cho k số nguyên tố đầu và độ dài L = 2^log_len: hoán vị đảo bit, twiddle thuận/nghịch, L^-1"""
+    L = 1 << log_len
+    primes = NTT_PRIMES[:k]
+    rev = np.zeros(L, dtype=np.int64)
+    for bit in range(log_len):
+        rev |= ((np.arange(L) >> bit) & 1) << (log_len - 1 - bit)
+
+    forward, inverse = [], []
+    m = 1
+    while m < L:
+        fw = np.empty((k, m), dtype=np.uint64)
+        iw = np.empty((k, m), dtype=np.uint64)
+        for i, p in enumerate(primes):
+            w = pow(_primitive_root(p), (p - 1) // (2 * m), p)
+            w_inv = pow(w, -1, p)
+            fw[i] = [pow(w, j, p) for j in range(m)] if m <= 64 else _powers(w, m, p)
+            iw[i] = [pow(w_inv, j, p) for j in range(m)] if m <= 64 else _powers(w_inv, m, p)
+        forward.append(fw)
+        inverse.append(iw)
+        m *= 2
+    P = np.array(primes, dtype=np.uint64).reshape(k, 1)
+    l_inv = np.array([pow(L, -1, p) for p in primes], dtype=np.uint64).reshape(k, 1)
+    return rev, forward, inverse, P, l_inv
+
+
+def _powers(w, m, p):
+    """[w^0, ..., w^(m-1)] mod p, nhân đôi độ dài mỗi bước bằng NumPy"""
+    res = np.ones(m, dtype=np.uint64)
+    filled, step = 1, w
+    while filled < m:
+        take = min(filled, m - filled)
+        res[filled:filled + take] = res[:take] * np.uint64(step) % np.uint64(p)
+        filled += take
+        step = step * step % p
+    return res
+
+
+def _ntt(a, twiddles, rev, P):
+    """NTT Cooley-Tukey lặp trên cả k hàng (mỗi hàng một số nguyên tố), a có dạng (k, L)"""
+    k, L = a.shape
+    a = a[:, rev]
+    P4 = P.reshape(k, 1, 1)
+    m = 1
+    for w in twiddles:
+        blocks = a.reshape(k, L // (2 * m), 2, m)
+        u = blocks[:, :, 0, :].copy()
+        v = blocks[:, :, 1, :] * w[:, None, :] % P4
+        # Cộng/trừ modulo không dùng %: min(s, s - p) trên uint64 (s - p tràn khi s < p)
+        total = u + v
+        np.minimum(total, total - P4, out=blocks[:, :, 0, :])
+        total = u + P4 - v
+        np.minimum(total, total - P4, out=blocks[:, :, 1, :])
+        m *= 2
+    return a
+
+
+def _mulmod_small(a, b, n):
+    """
+    a * b mod n theo phần tử với a < 2^30, b < n < 2^62: ước lượng thương bằng float64
+    (sai tối đa 1), phần dư tính trên uint64 tràn vòng rồi chỉnh về [0, n)
+    """
+    q = np.floor(a.astype(np.float64) * float(b) / float(n)).astype(np.uint64)
+    rem = (a * np.uint64(b) - q * np.uint64(n)).view(np.int64)
+    rem = np.where(rem < 0, rem + np.int64(n), rem)
+    rem = np.where(rem >= np.int64(n), rem - np.int64(n), rem)
+    return rem.view(np.uint64)
+
+
+@lru_cache(maxsize=64)
+def _crt_constants(k, n):
+    """Hằng số Garner: nghịch đảo p_j mod p_i và tích tiền tố M_i = p_0...p_{i-1} mod n"""
+    primes = NTT_PRIMES[:k]
+    inv = [[pow(primes[j], -1, primes[i]) if j < i else 0 for j in range(k)] for i in range(k)]
+    prefix, M = [], 1
+    for p in primes:
+        prefix.append(M % n)
+        M *= p
+    return inv, prefix
+
+
+def ntt_mul_mod(a, b, r, n):
+    """
+    Nhân hai đa thức (mảng uint64 độ dài r, hệ số < n < 2^62) modulo (x^r - 1, n).
+    Biến đổi NTT theo vài số nguyên tố 30 bit đủ để tích của chúng vượt r (n - 1)^2,
+    gập x^r = 1 trên các phần dư rồi ghép CRT (Garner) và lấy mod n ngay trên uint64.
+    """
+    r, n = int(r), int(n)
+    bound = r * (n - 1) ** 2
+    k, M = 0, 1
+    while M <= bound:
+        M *= NTT_PRIMES[k]
+        k += 1
+    log_len = max(1, (2 * r - 2).bit_length())
+    if log_len > NTT_MAX_LOG:
+        raise ValueError("r quá lớn cho NTT (cần 2r - 1 <= 2^22)")
+    rev, forward, inverse, P, l_inv = _ntt_tables(k, log_len)
+    L = 1 << log_len
+
+    def transform(x):
+        padded = np.zeros((k, L), dtype=np.uint64)
+        padded[:, :r] = x[None, :] % P
+        return _ntt(padded, forward, rev, P)
+
+    fa = transform(a)
+    fb = fa if b is a else transform(b)
+    c = _ntt(fa * fb % P, inverse, rev, P) * l_inv % P
+
+    # Gập x^r = 1 trước khi ghép CRT: chỉ còn r hệ số
+    folded = c[:, :r].copy()
+    folded[:, :r - 1] = (folded[:, :r - 1] + c[:, r:2 * r - 1]) % P
+
+    # Garner: x = v_0 + v_1 p_0 + v_2 p_0 p_1 + ..., với 0 <= v_i < p_i
+    inv, prefix = _crt_constants(k, n)
+    primes = [np.uint64(p) for p in NTT_PRIMES[:k]]
+    digits = []
+    for i in range(k):
+        v = folded[i]
+        for j in range(i):
+            v = (v + primes[i] - digits[j] % primes[i]) % primes[i] * np.uint64(inv[i][j]) % primes[i]
+        digits.append(v)
+
+    n64 = np.uint64(n)
+    result = np.zeros(r, dtype=np.uint64)
+    for v, m in zip(digits, prefix):
+        result = result + _mulmod_small(v, m, n)
+        result = np.where(result >= n64, result - n64, result)
+    return result
@@ -1,11 +1,30 @@
-from random import randint
+from functools import lru_cache
+from random import Random, randint
 import gmpy2
+import numpy as np
 from gmpy2 import mpz
 import multiprocessing as mp
 
+from SubDef.SD_ECM import ECM_SCHEDULE, ecm_factor, primes_upto, stage1_exponent
+from SubDef.SD_Perfect_Power import perfect_power
+from SubDef.SD_SIQS import siqs_factor
 
-def pollard_rho(n, seed=2, max_steps=10000):
-    """Thuật toán Pollard's Rho để tìm một thừa số nguyên tố của n."""
+TRIAL_PRIMES = [3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47]
+FACTOR_CACHE_SIZE = 256
+RHO_BUDGET = 200000  # Số bước Pollard-Brent trước khi chuyển sang ECM
+ECM_PARALLEL_BITS = 100  # Chỉ chạy ECM/SIQS đa tiến trình cho n đủ lớn
+ECM_LEVELS = 2  # Số mức B1 của ECM_SCHEDULE thử trước khi chuyển sang SIQS
+SIQS_MAX_DIGITS = 100
+PM1_B1 = 10000  # Cận stage 1 cho p-1 / p+1 (stage 2 mặc định tới 100 * B1)
+PP1_SEEDS = [(2, 7), (6, 5), (3, 1)]  # Các seed A = u/v cho Williams p+1 (A^2 - 4 = -3, -1, 5 lần lượt)
+PM1_MIN_BITS = 64  # n tới cỡ này thì rho (<= 2^16 bước kỳ vọng) luôn rẻ hơn p-1 / p+1, chỉ dùng p -+ 1 khi rho hết ngân sách
+
+
+def pollard_rho(n, seed=2, batch=100, max_iterations=None):
+    """Pollard's Rho biến thể Brent: trả về một ước không tầm thường của hợp số n.
+    Tích các |x - y| được gộp lại và chỉ lấy gcd sau mỗi batch bước;
+    nếu gcd nhảy lên n thì quay lui từng bước từ đầu batch.
+    max_iterations: ngân sách bước, hết ngân sách thì trả về None (mặc định không giới hạn)."""
     n = mpz(n)
     if n == 1:
         return None
@@ -14,65 +33,204 @@ def pollard_rho(n, seed=2, max_steps=10000):
     if gmpy2.is_even(n):
         return mpz(2)
 
-    def f(x):
-        return (x * x + 1) % n
+    iterations = 0
+    while True:
+        y = mpz(seed)
+        c = mpz(randint(1, n - 1))
+        g = r = q = mpz(1)
 
-    x = mpz(seed)
-    y = x
-    c = mpz(randint(1, n - 1))
-    d = mpz(1)
-    steps = 0
+        while g == 1:
+            if max_iterations is not None and iterations >= max_iterations:
+                return None
+            iterations += 2 * r
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(batch, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gmpy2.gcd(q, n)
+                k += batch
+            r *= 2
 
-    while d == 1 and steps < max_steps:
-        x = f(x)
-        y = f(f(y))
-        d = gmpy2.gcd(abs(x - y), n)
-        if d == n:
-            return None  # Thử lại với seed khác
-        steps += 1
+        if g == n:
+            # Quay lui: tìm lại bước đầu tiên làm gcd > 1
+            while True:
+                ys = (ys * ys + c) % n
+                g = gmpy2.gcd(abs(x - ys), n)
+                if g > 1:
+                    break
 
-    if gmpy2.is_prime(d):
-        return d
-    return pollard_rho(d, seed + 1, max_steps)  # Đệ quy trên thừa số tìm được
+        if g != n:
+            return g
+        seed += 1  # Chu trình suy biến, thử lại với seed và c khác
 
-def factorize(n):
-    """Phân tích n thành các nhân tử nguyên tố sử dụng Pollard's Rho và trial division."""
-    # start_time = time.time()
+
+@lru_cache(maxsize=4)
+def _prime_gaps(B1, B2):
+    """Bảng cho stage 2: số nguyên tố đầu tiên > B1, dãy khoảng cách giữa các
+    số nguyên tố trong (B1, B2] và tập các khoảng cách khác nhau."""
+    primes = np.array(primes_upto(B2), dtype=np.int64)
+    primes = primes[primes > B1]
+    if len(primes) == 0:
+        return None, (), ()
+    gaps = np.diff(primes)
+    return int(primes[0]), tuple(int(g) for g in gaps), tuple(sorted(set(gaps.tolist())))
+
+
+def pollard_pm1(n, B1=PM1_B1, B2=None):
+    """Pollard p-1: tìm ước p của n khi p - 1 là B1-smooth (trừ một thừa số <= B2).
+    Stage 1 là một phép lũy thừa với số mũ cache sẵn, stage 2 đi theo bảng khoảng cách nguyên tố."""
+    n = mpz(n)
+    if B2 is None:
+        B2 = 100 * B1
+    x = gmpy2.powmod(2, stage1_exponent(B1), n)
+    g = gmpy2.gcd(x - 1, n)
+    if 1 < g < n:
+        return g
+    if g == n:
+        return None
+
+    # Stage 2: x^q với q nguyên tố trong (B1, B2], nhân dần x^gap từ bảng
+    first, gaps, distinct = _prime_gaps(B1, B2)
+    if first is None:
+        return None
+    table = {d: gmpy2.powmod(x, d, n) for d in distinct}
+    y = gmpy2.powmod(x, first, n)
+    acc = y - 1
+    for d in gaps:
+        y = y * table[d] % n
+        acc = acc * (y - 1) % n
+    g = gmpy2.gcd(acc, n)
+    return g if 1 < g < n else None
+
+
+def _lucas_v(A, k, n):
+    """V_k(A) mod n của dãy Lucas V_0 = 2, V_1 = A, V_{i+1} = A V_i - V_{i-1}."""
+    x, y = A, (A * A - 2) % n
+    for bit in bin(k)[3:]:
+        if bit == '1':
+            x, y = (x * y - A) % n, (y * y - 2) % n
+        else:
+            x, y = (x * x - 2) % n, (x * y - A) % n
+    return x
+
+
+def williams_pp1(n, B1=PM1_B1, B2=None, seeds=PP1_SEEDS):
+    """Williams p+1: tìm ước p của n khi p + 1 là B1-smooth (trừ một thừa số <= B2).
+    Mỗi seed A = u/v chỉ hiệu quả khi A^2 - 4 không chính phương mod p."""
     n = mpz(n)
-    factors = []
+    if B2 is None:
+        B2 = 100 * B1
+    first, gaps, distinct = _prime_gaps(B1, B2)
+    for u, v in seeds:
+        if gmpy2.gcd(v, n) != 1:
+            return gmpy2.gcd(v, n)
+        A = u * gmpy2.invert(v, n) % n
+        V = _lucas_v(A, stage1_exponent(B1), n)
+        g = gmpy2.gcd(V - 2, n)
+        if 1 < g < n:
+            return g
+        if g == n or first is None:
+            continue
+
+        # Stage 2 trong Z_n[t]/(t^2 - V t + 1): vết của t^q là V_{kq}
+        def mul(a, b):
+            a0, a1 = a
+            b0, b1 = b
+            c = a1 * b1
+            return (a0 * b0 - c) % n, (a0 * b1 + a1 * b0 + V * c) % n
+
+        def power(a, e):
+            res = (mpz(1), mpz(0))
+            for bit in bin(e)[2:]:
+                res = mul(res, res)
+                if bit == '1':
+                    res = mul(res, a)
+            return res
+
+        t = (mpz(0), mpz(1))
+        table = {d: power(t, d) for d in distinct}
+        y = power(t, first)
+        acc = 2 * y[0] + V * y[1] - 2
+        for d in gaps:
+            y = mul(y, table[d])
+            acc = acc * (2 * y[0] + V * y[1] - 2) % n
+        g = gmpy2.gcd(acc, n)
+        if 1 < g < n:
+            return g
+    return None
+
+
+def _split(n, factors, multiplicity=1):
+    """Tách đệ quy n cho tới khi mọi thừa số đều là số nguyên tố."""
+    if n == 1:
+        return
+    if gmpy2.is_prime(n):
+        factors[n] = factors.get(n, 0) + multiplicity
+        return
+    # p-1 / p+1 bắt các thừa số có p -+ 1 smooth, Pollard-Brent bắt nhanh các thừa số nhỏ,
+    # ECM cho các thừa số 20-40 chữ số, SIQS cho phần còn lại tới ~100 chữ số.
+    # n nhỏ thì rho có ngân sách chạy trước, p -+ 1 chỉ là phương án dự phòng
+    small = n.bit_length() <= PM1_MIN_BITS
+    d = pollard_rho(n, max_iterations=RHO_BUDGET) if small else None
+    if d is None:
+        # Lũy thừa hoàn hảo tách ngay bằng iroot (p -+ 1, ECM đều chậm trên p^k)
+        power = perfect_power(n)
+        if power is not None:
+            _split(power[0], factors, multiplicity * power[1])
+            return
+        d = pollard_pm1(n)
+    if d is None:
+        d = pollard_pm1(n)
+    if d is None:
+        d = williams_pp1(n)
+    if d is None and not small:
+        d = pollard_rho(n, max_iterations=RHO_BUDGET)
+    if d is None:
+        d = ecm_factor(n, use_parallel=n.bit_length() > ECM_PARALLEL_BITS,
+                       schedule=ECM_SCHEDULE[:ECM_LEVELS])
+    if d is None and len(str(n)) <= SIQS_MAX_DIGITS:
+        d = siqs_factor(n, use_parallel=n.bit_length() > ECM_PARALLEL_BITS)
+    if d is None:
+        d = pollard_rho(n)
+    # Gộp các lần xuất hiện của d trong n để không tách lặp lại
+    n, e = gmpy2.remove(n, d)
+    _split(d, factors, multiplicity * e)
+    _split(n, factors, multiplicity)
+
+
+@lru_cache(maxsize=FACTOR_CACHE_SIZE)
+def _factorize_cached(n):
+    n = mpz(n)
+    factors = {}
 
     # Xử lý thừa số 2 trước
-    while gmpy2.is_even(n):
-        factors.append(mpz(2))
-        n //= 2
+    n, e = gmpy2.remove(n, 2) if n > 0 else (n, 0)
+    if e:
+        factors[mpz(2)] = e
 
     # Thử chia cho các số nhỏ (tối ưu cho các thừa số nhỏ)
-    for i in [3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47]:
-        while n % i == 0:
-            factors.append(mpz(i))
-            n //= i
-
-    # Nếu n vẫn lớn, dùng Pollard's Rho
-    while n > 1:
-        if gmpy2.is_prime(n):
-            factors.append(n)
-            break
-        factor = pollard_rho(n)
-        if factor is None:
-            # Nếu Pollard's Rho thất bại, thử seed khác hoặc tăng max_steps
-            factor = pollard_rho(n, seed=randint(1, 100), max_steps=100000)
-        if factor:
-            factors.append(factor)
-            n //= factor
-        else:
-            # Nếu không tìm được, có thể n là nguyên tố hoặc cần thuật toán khác
-            factors.append(n)
-            break
+    for i in TRIAL_PRIMES:
+        n, e = gmpy2.remove(n, i)
+        if e:
+            factors[mpz(i)] = e
+
+    # Phần còn lại dùng Pollard-Brent
+    _split(n, factors)
+    return tuple(sorted(factors.items()))
 
-    # Trả về danh sách các nhân tử nguyên tố duy nhất
-    factors = list(set(factors))
-    # print(f"Factoring took {time.time() - start_time:.2f} seconds. Factors: {factors}")
-    return factors
+
+def factorize(n):
+    """Phân tích n thành thừa số nguyên tố: trả về dict {p: số mũ}.
+    Duyệt dict cho ra các ước nguyên tố phân biệt. Kết quả được cache theo n (LRU)."""
+    n = int(n)
+    if n < 1:
+        raise ValueError(f"Chỉ phân tích được số nguyên n >= 1 (nhận {n})")
+    return dict(_factorize_cached(n))
 
 def is_primitive_root(g, p, factors):
     """Kiểm tra xem g có phải là căn nguyên thủy của p không."""
@@ -84,13 +242,32 @@ def is_primitive_root(g, p, factors):
             return False
     return True
 
-def worker(args):
-    """Worker cho parallel checking."""
-    g, p, factors = args
-    return g if is_primitive_root(g, p, factors) else None
+# Trạng thái dùng chung của worker, gửi một lần qua initializer
+_worker_p = None
+_worker_factors = None
+
+
+def _init_worker(p, factors):
+    """Initializer cho Pool: lưu p và các ước của p-1 trong mỗi worker."""
+    global _worker_p, _worker_factors
+    _worker_p = mpz(p)
+    _worker_factors = factors
+
+
+def _search_chunk(args):
+    """Worker: thử chunk_size ứng viên ngẫu nhiên sinh từ seed, trả về g đầu tiên đạt."""
+    seed, chunk_size = args
+    rng = Random(seed)
+    upper = int(_worker_p - 1)
+    for _ in range(chunk_size):
+        g = rng.randint(2, upper)
+        if is_primitive_root(g, _worker_p, _worker_factors):
+            return g
+    return None
 
-def find_primitive_root(p, use_parallel=True):
-    """Tìm căn nguyên thủy của số nguyên tố p."""
+def find_primitive_root(p, use_parallel=True, factors=None):
+    """Tìm căn nguyên thủy của số nguyên tố p.
+    factors: các ước nguyên tố của p-1 nếu đã phân tích sẵn."""
     p = mpz(p)
 
     # Kiểm tra xem p có phải là số nguyên tố
@@ -99,7 +276,8 @@ def find_primitive_root(p, use_parallel=True):
 
     # Phân tích p-1 thành các nhân tử nguyên tố
     p_minus_1 = p - 1
-    factors = factorize(p_minus_1)
+    if factors is None:
+        factors = factorize(p_minus_1)
 
     # Thử các g nhỏ trước
     small_gs = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71]
@@ -110,13 +288,14 @@ def find_primitive_root(p, use_parallel=True):
     # Thử ngẫu nhiên với parallel nếu bật
     trials = 100000
     if use_parallel:
-        pool = mp.Pool(mp.cpu_count())  # Sử dụng tất cả lõi của Ryzen
-        candidates = [(randint(2, int(p - 1)), p, factors) for _ in range(trials)]
-        results = pool.map(worker, candidates)
-        pool.close()
-        for res in results:
-            if res is not None:
-                return mpz(res)
+        # Mỗi task chỉ là (seed, chunk_size), ứng viên được sinh ngay trong worker
+        chunk_size = 64
+        seeds = ((randint(0, 2 ** 63), chunk_size) for _ in range(trials // chunk_size))
+        with mp.Pool(mp.cpu_count(), initializer=_init_worker, initargs=(p, factors)) as pool:
+            for res in pool.imap_unordered(_search_chunk, seeds):
+                if res is not None:
+                    pool.terminate()  # Hủy các chunk còn lại ngay khi tìm thấy
+                    return mpz(res)
     else:
         # Sequential
         for _ in range(trials):
@@ -126,3 +305,39 @@ def find_primitive_root(p, use_parallel=True):
 
     return None, "No primitive root found after trials (increase trials or check factoring)"
 
+
+
+def count_primitive_roots(p, factors):
+    """Số căn nguyên thủy của p: phi(p-1) = (p-1) * prod(1 - 1/q)."""
+    count = mpz(p) - 1
+    for q in factors:
+        count = count // q * (q - 1)
+    return count
+
+
+def iter_primitive_roots(g, p, factors, limit=None):
+    """Sinh các căn nguyên thủy g^k mod p với gcd(k, p-1) = 1.
+    g: một căn nguyên thủy của p, factors: các ước nguyên tố của p-1.
+    Mỗi bước chỉ nhân thêm g một lần, gcd(k, p-1) = 1 kiểm tra bằng k % q."""
+    g = mpz(g)
+    p = mpz(p)
+    factors = [int(q) for q in factors]
+    power = g
+    found = 0
+    for k in range(1, int(p - 1)):
+        if limit is not None and found >= limit:
+            return
+        if all(k % q for q in factors):
+            yield power
+            found += 1
+        power = power * g % p
+
+
+def random_primitive_root(g, p, factors):
+    """Chọn ngẫu nhiên đều một căn nguyên thủy g^k với k nguyên tố cùng nhau với p-1."""
+    p = mpz(p)
+    factors = [int(q) for q in factors]
+    while True:
+        k = randint(1, int(p - 2))
+        if all(k % q for q in factors):
+            return gmpy2.powmod(g, k, p)
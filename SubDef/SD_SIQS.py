@@ -0,0 +1,401 @@
+from random import Random, randint
+import math
+import multiprocessing as mp
+
+import gmpy2
+import numpy as np
+from gmpy2 import mpz
+
+from Prime_All import SMALL_PRIMES
+
+"""
+Sàng bậc hai tự khởi tạo (SIQS) cho hợp số 40-100 chữ số
+- Cơ sở thừa số lấy từ SMALL_PRIMES (các p có (n/p) = 1)
+- Sàng vector hóa bằng NumPy trên đoạn [-M, M], một large prime cho mỗi quan hệ
+- Thu thập quan hệ song song theo từng hệ số A
+- Đại số tuyến tính trên GF(2): khử Gauss có cấu trúc, hàng nén vào các từ uint64
+"""
+
+# (số chữ số tối đa, kích thước cơ sở thừa số, nửa độ dài đoạn sàng M)
+SIQS_PARAMS = [
+    (30, 200, 32768),
+    (40, 500, 65536),
+    (50, 1200, 65536),
+    (60, 2500, 131072),
+    (70, 5000, 196608),
+    (80, 8000, 262144),
+    (90, 14000, 327680),
+    (100, 24000, 393216),
+]
+SIEVE_SKIP = 30        # Không sàng các p nhỏ hơn (nhiều lần ghi, ít thông tin)
+THRESHOLD_FUDGE = 2.2  # Cho phép phần dư cỡ pmax^fudge trước khi chia thử
+LARGE_PRIME_MULT = 64  # Chấp nhận large prime < LARGE_PRIME_MULT * pmax
+EXTRA_RELATIONS = 16   # Số quan hệ dư để có đủ phụ thuộc tuyến tính
+
+
+def _sqrt_mod_small(a, p):
+    """Căn bậc hai mod số nguyên tố nhỏ p (Tonelli-Shanks), a là thặng dư bậc hai."""
+    a %= p
+    if p == 2 or a == 0:
+        return a
+    if p % 4 == 3:
+        return pow(a, (p + 1) // 4, p)
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q //= 2
+        s += 1
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    m, c, t, r = s, pow(z, q, p), pow(a, q, p), pow(a, (q + 1) // 2, p)
+    while t != 1:
+        i, t2 = 1, t * t % p
+        while t2 != 1:
+            t2 = t2 * t2 % p
+            i += 1
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c, t, r = i, b * b % p, t * b * b % p, r * b % p
+    return r
+
+
+def _choose_params(n):
+    digits = len(str(n))
+    for max_digits, fb_size, M in SIQS_PARAMS:
+        if digits <= max_digits:
+            return fb_size, M
+    return SIQS_PARAMS[-1][1:]
+
+
+def build_factor_base(n, size):
+    """Cơ sở thừa số: 2 và các p lẻ với (n/p) = 1, kèm căn bậc hai của n mod p.
+    Trả về (primes, sqrt_n_mod_p) hoặc một ước của n nếu gặp p | n."""
+    primes = [2]
+    roots = [int(n % 2)]
+    for p in SMALL_PRIMES[1:]:
+        if len(primes) >= size:
+            break
+        res = gmpy2.legendre(n, p)
+        if res == 0:
+            return p
+        if res == 1:
+            primes.append(p)
+            roots.append(_sqrt_mod_small(int(n % p), p))
+    return np.array(primes, dtype=np.int64), np.array(roots, dtype=np.int64)
+
+
+class _Sieve:
+    """Trạng thái sàng cho một n; dùng chung trong một process."""
+
+    def __init__(self, n, primes, roots, M):
+        self.n = mpz(n)
+        self.primes = primes
+        self.roots = roots
+        self.M = M
+        self.logs = np.round(np.log2(primes)).astype(np.uint8)
+        self.pmax = int(primes[-1])
+        self.large_bound = self.pmax * LARGE_PRIME_MULT
+        # log2 |g(x)| ~ log2(M * sqrt(n / 2)) trên đoạn sàng
+        self.threshold = int(math.log2(M) + self.n.bit_length() / 2 - 0.5
+                             - THRESHOLD_FUDGE * math.log2(self.pmax))
+        self.sieve_from = int(np.searchsorted(primes, SIEVE_SKIP))
+
+    def choose_a(self, rng):
+        """Chọn A = q_1...q_s ~ sqrt(2n)/M từ dải giữa của cơ sở thừa số."""
+        target = gmpy2.isqrt(2 * self.n) // self.M
+        lo = max(self.sieve_from, len(self.primes) // 3)
+        hi = max(lo + 2, 2 * len(self.primes) // 3)
+        band = [int(p) for p in self.primes[lo:hi]]
+        q_mid = band[len(band) // 2]
+        s = max(1, round(math.log(target) / math.log(q_mid)))
+        while True:
+            chosen = rng.sample(band, min(s - 1, len(band) - 1)) if s > 1 else []
+            rest = target // math.prod(chosen) if chosen else target
+            last = min((p for p in band if p not in chosen), key=lambda p: abs(p - rest))
+            chosen.append(last)
+            A = mpz(math.prod(chosen))
+            if A > 1:
+                return A, sorted(chosen)
+
+    def relations_for_a(self, A, qs):
+        """Sàng mọi đa thức (Ax + b)^2 - n ứng với A (duyệt b theo mã Gray)."""
+        n, primes, roots = self.n, self.primes, self.roots
+        q_index = [int(np.searchsorted(primes, q)) for q in qs]
+        s = len(qs)
+
+        # B_l = (A/q_l) * (t_l * (A/q_l)^-1 mod q_l), b^2 = n (mod A) với b = sum B_l
+        B = []
+        for q, qi in zip(qs, q_index):
+            a_l = A // q
+            g = int(roots[qi]) * int(gmpy2.invert(a_l % q, q)) % q
+            if g > q // 2:
+                g = q - g
+            B.append(a_l * g)
+
+        mask = np.ones(len(primes), dtype=np.bool_)
+        mask[q_index] = False
+        mask[0] = False
+        ps = primes[mask]
+        ts = roots[mask]
+        logs = self.logs[mask]
+        plist = [int(p) for p in ps]
+        ainv = np.array([pow(int(A % p), -1, p) for p in plist], dtype=np.int64)
+        # Bước cập nhật nghiệm khi đổi dấu B_l: 2 * B_l * A^-1 mod p
+        bainv = [np.array([int(2 * Bl % p) for p in plist], dtype=np.int64) * ainv % ps for Bl in B]
+
+        b = sum(B)
+        b_mod = np.array([int(b % p) for p in plist], dtype=np.int64)
+        r1 = ainv * ((ts - b_mod) % ps) % ps
+        r2 = ainv * ((-ts - b_mod) % ps) % ps
+
+        relations = []
+        for i in range(1 << (s - 1)):
+            if i > 0:
+                # Mã Gray: đổi dấu B_v với v là bit thấp nhất của i
+                v = (i & -i).bit_length() - 1
+                sign = 1 if (i >> (v + 1)) & 1 else -1
+                b = b + 2 * sign * B[v]
+                r1 = (r1 - sign * bainv[v]) % ps
+                r2 = (r2 - sign * bainv[v]) % ps
+            relations.extend(self._sieve_poly(A, b, qs, ps, logs, r1, r2))
+        return relations
+
+    def _sieve_poly(self, A, b, qs, ps, logs, r1, r2):
+        M = self.M
+        size = 2 * M
+        sieve = np.zeros(size, dtype=np.uint8)
+        # Dời gốc: chỉ số j ứng với x = j - M
+        s1 = (r1 + M) % ps
+        s2 = (r2 + M) % ps
+
+        small = int(np.searchsorted(ps, SIEVE_SKIP))
+        large = int(np.searchsorted(ps, M))
+        for k in range(small, large):
+            p = int(ps[k])
+            sieve[s1[k]::p] += logs[k]
+            if s2[k] != s1[k]:
+                sieve[s2[k]::p] += logs[k]
+
+        # Số nguyên tố p >= M: tối đa 2 lần ghi mỗi nghiệm, cộng dồn vector hóa
+        if large < len(ps):
+            pl, ll = ps[large:], logs[large:]
+            for start in (s1[large:], s2[large:]):
+                for step in (0, 1):
+                    pos = start + step * pl
+                    ok = pos < size
+                    np.add.at(sieve, pos[ok], ll[ok])
+
+        candidates = np.nonzero(sieve >= self.threshold)[0]
+        c = (b * b - self.n) // A
+        found = []
+        for j in candidates:
+            x = int(j) - M
+            rel = self._check(A, b, c, x, qs, ps, r1, r2)
+            if rel is not None:
+                found.append(rel)
+        return found
+
+    def _check(self, A, b, c, x, qs, ps, r1, r2):
+        """Chia thử g(x) = Ax^2 + 2bx + c trên cơ sở thừa số."""
+        value = (A * x + 2 * b) * x + c
+        y = A * x + b
+        factors = {}
+        sign = 0
+        if value < 0:
+            sign = 1
+            value = -value
+        if value == 0:
+            return None
+
+        for q in qs:  # A | Q(x): mỗi q_l xuất hiện thêm 1 lần ngoài phần của g(x)
+            value, e = gmpy2.remove(value, q)
+            factors[q] = 1 + e
+        # p nhỏ và p = 2: chia trực tiếp
+        for p in self.primes[:self.sieve_from]:
+            value, e = gmpy2.remove(value, int(p)) if value % int(p) == 0 else (value, 0)
+            if e:
+                factors[int(p)] = factors.get(int(p), 0) + e
+        # p lớn hơn: chỉ những p có x là nghiệm mod p
+        xm = x % ps
+        hit = np.nonzero((xm == r1) | (xm == r2))[0]
+        for k in hit:
+            p = int(ps[k])
+            value, e = gmpy2.remove(value, p)
+            if e:
+                factors[p] = factors.get(p, 0) + e
+
+        if value == 1:
+            return int(y), sign, factors, 1
+        if value < self.large_bound:
+            return int(y), sign, factors, int(value)
+        return None
+
+
+# Trạng thái dùng chung của worker, gửi một lần qua initializer
+_worker_sieve = None
+
+
+def _init_worker(n, primes, roots, M):
+    """Initializer cho Pool: dựng trạng thái sàng trong mỗi worker."""
+    global _worker_sieve
+    _worker_sieve = _Sieve(n, primes, roots, M)
+
+
+def _relations_worker(seed):
+    """Worker: chọn một A ngẫu nhiên và trả về mọi quan hệ tìm được."""
+    rng = Random(seed)
+    A, qs = _worker_sieve.choose_a(rng)
+    return _worker_sieve.relations_for_a(A, qs)
+
+
+def _pack_rows(rows, ncols):
+    """Nén danh sách tập chỉ số cột thành ma trận bit uint64 (mỗi hàng một quan hệ)."""
+    words = (ncols + 63) // 64
+    mat = np.zeros((len(rows), words), dtype=np.uint64)
+    for i, cols in enumerate(rows):
+        for col in cols:
+            mat[i, col >> 6] ^= np.uint64(1) << np.uint64(col & 63)
+    return mat
+
+
+def _structured_prune(rows):
+    """Khử có cấu trúc: bỏ lặp các hàng chứa cột chỉ xuất hiện một lần."""
+    alive = list(range(len(rows)))
+    while True:
+        count = {}
+        for i in alive:
+            for col in rows[i]:
+                count[col] = count.get(col, 0) + 1
+        keep = [i for i in alive if all(count[col] > 1 for col in rows[i])]
+        if len(keep) == len(alive):
+            return alive
+        alive = keep
+
+
+def find_dependencies(rows, ncols):
+    """Tìm các tổ hợp hàng có tổng bằng 0 trên GF(2). Trả về list các list chỉ số hàng."""
+    alive = _structured_prune(rows)
+    if not alive:
+        return []
+    # Đánh lại chỉ số các cột còn dùng
+    used = sorted({col for i in alive for col in rows[i]})
+    remap = {col: k for k, col in enumerate(used)}
+    mat = _pack_rows([[remap[col] for col in rows[i]] for i in alive], len(used))
+    hist = _pack_rows([[k] for k in range(len(alive))], len(alive))
+
+    pivoted = np.zeros(len(alive), dtype=np.bool_)
+    for col in range(len(used)):
+        word, bit = col >> 6, np.uint64(1) << np.uint64(col & 63)
+        has = (mat[:, word] & bit) != 0
+        cand = np.nonzero(has & ~pivoted)[0]
+        if len(cand) == 0:
+            continue
+        piv = cand[0]
+        pivoted[piv] = True
+        others = has.copy()
+        others[piv] = False
+        mat[others] ^= mat[piv]
+        hist[others] ^= hist[piv]
+
+    deps = []
+    for i in np.nonzero(~mat.any(axis=1))[0]:
+        bits = []
+        for w, val in enumerate(hist[i]):
+            val = int(val)
+            while val:
+                low = val & -val
+                bits.append(alive[(w << 6) + low.bit_length() - 1])
+                val ^= low
+        deps.append(bits)
+    return deps
+
+
+def _combine_partials(relations):
+    """Ghép các quan hệ có cùng large prime thành quan hệ đầy đủ."""
+    full = []
+    partial = {}
+    for y, sign, factors, large in relations:
+        if large == 1:
+            full.append((y, sign, factors, 1))
+        elif large in partial:
+            y2, sign2, factors2 = partial[large]
+            merged = dict(factors)
+            for p, e in factors2.items():
+                merged[p] = merged.get(p, 0) + e
+            full.append((y * y2, sign ^ sign2, merged, large))
+        else:
+            partial[large] = (y, sign, factors)
+    return full
+
+
+def _try_dependencies(n, relations, deps):
+    for dep in deps:
+        x = mpz(1)
+        y = mpz(1)
+        exps = {}
+        for i in dep:
+            rel_y, _, factors, extra = relations[i]
+            x = x * rel_y % n
+            y = y * extra % n
+            for p, e in factors.items():
+                exps[p] = exps.get(p, 0) + e
+        for p, e in exps.items():
+            y = y * gmpy2.powmod(p, e // 2, n) % n
+        g = gmpy2.gcd(x - y, n)
+        if 1 < g < n:
+            return g
+    return None
+
+
+def siqs_factor(n, use_parallel=True, fb_size=None, M=None):
+    """
+    Tìm một ước không tầm thường của hợp số n (không phải lũy thừa hoàn hảo) bằng SIQS.
+    Trả về ước tìm được hoặc None.
+    """
+    n = mpz(n)
+    if gmpy2.is_even(n):
+        return mpz(2)
+    root, exact = gmpy2.iroot(n, 2)
+    if exact:
+        return root
+
+    default_fb, default_M = _choose_params(n)
+    fb_size = fb_size or default_fb
+    M = M or default_M
+    fb = build_factor_base(n, fb_size)
+    if not isinstance(fb, tuple):
+        return mpz(fb)
+    primes, roots = fb
+    index = {int(p): k + 1 for k, p in enumerate(primes)}  # Cột 0 dành cho dấu
+    ncols = len(primes) + 1
+
+    raw = []
+    seen = set()
+    full = []
+    seeds = iter(lambda: randint(0, 2 ** 63), None)
+    pool = None
+    try:
+        if use_parallel:
+            pool = mp.Pool(mp.cpu_count(), initializer=_init_worker, initargs=(n, primes, roots, M))
+            batches = pool.imap_unordered(_relations_worker, seeds)
+        else:
+            _init_worker(n, primes, roots, M)
+            batches = map(_relations_worker, seeds)
+
+        for batch in batches:
+            for rel in batch:
+                if rel[0] not in seen:
+                    seen.add(rel[0])
+                    raw.append(rel)
+            full = _combine_partials(raw)
+            if len(full) < ncols + EXTRA_RELATIONS:
+                continue
+
+            rows = [[0] * rel[1] + [index[p] for p, e in rel[2].items() if e & 1] for rel in full]
+            deps = find_dependencies(rows, ncols)
+            g = _try_dependencies(n, full, deps)
+            if g is not None:
+                return g
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return None
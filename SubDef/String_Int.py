@@ -1,24 +1,85 @@
+import codecs
+
 from gmpy2 import mpz
-from NumberTheory import modulo
-ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-BASE = len(ALPHABET)
+
+"""
+Chuyển đổi thông điệp <-> số nguyên trên các byte UTF-8
+- text_to_int / int_to_text: cả thông điệp thành một số (big-endian)
+- iter_blocks / iter_block_bytes: chia thông điệp thành các khối nhỏ hơn modulo,
+  dạng generator để mã hóa được đầu vào dài tùy ý trong thời gian tuyến tính
+"""
+
+BLOCK_PREFIX = b'\x01'  # Byte đầu mỗi khối, giữ lại các byte 0 ở đầu khối
+
+
+def _to_bytes(message):
+    """Chuỗi -> byte UTF-8, bytes giữ nguyên"""
+    if isinstance(message, str):
+        return message.encode('utf-8')
+    return bytes(message)
+
 
 def text_to_int(text):
-    """Chuyển chuỗi (A-Z) sang số nguyên trong hệ 10, coi là cơ số 26"""
+    """Chuyển thông điệp (str hoặc bytes) sang số nguyên từ các byte UTF-8 (big-endian)"""
     if not text:
-        return 0
-    result = mpz(0)
-    for char in text:
-        result = result * 256 + ord(char)
-    return result
+        return mpz(0)
+    return mpz.from_bytes(_to_bytes(text), 'big')
 
-def int_to_text(number):
-    """Chuyển số nguyên về chuỗi A-Z theo cơ số 26"""
-    if number == 0:
-        return ""
+
+def int_to_bytes(number):
+    """Chuyển số nguyên về dãy byte big-endian (số 0 -> b'')"""
     number = mpz(number)
-    chars = []
-    while number > 0:
-        chars.append(chr(modulo(number, 256)))
-        number //= 256
-    return ''.join(reversed(chars))
\ No newline at end of file
+    return number.to_bytes((number.bit_length() + 7) // 8, 'big')
+
+
+def int_to_text(number):
+    """Chuyển số nguyên về chuỗi bằng cách giải mã UTF-8 các byte của nó"""
+    return int_to_bytes(number).decode('utf-8')
+
+
+def block_size(modulus):
+    """Số byte dữ liệu mỗi khối sao cho 0x01 || khối luôn nhỏ hơn modulus"""
+    size = (mpz(modulus).bit_length() - 1) // 8 - 1
+    if size < 1:
+        raise ValueError("Modulo quá nhỏ để chia khối (cần ít nhất 17 bit)")
+    return size
+
+
+def _iter_chunks(message):
+    """Duyệt thông điệp theo từng đoạn byte: str/bytes hoặc iterable các str/bytes (ví dụ file)"""
+    if isinstance(message, (str, bytes, bytearray, memoryview)):
+        yield _to_bytes(message)
+    else:
+        for chunk in message:
+            yield _to_bytes(chunk)
+
+
+def iter_blocks(message, modulus):
+    """Generator: chia thông điệp thành các số nguyên 0x01 || khối < modulus"""
+    size = block_size(modulus)
+    buffer = bytearray()
+    for chunk in _iter_chunks(message):
+        buffer += chunk
+        full = len(buffer) - len(buffer) % size
+        for start in range(0, full, size):
+            yield mpz.from_bytes(BLOCK_PREFIX + buffer[start:start + size], 'big')
+        del buffer[:full]
+    if buffer:
+        yield mpz.from_bytes(BLOCK_PREFIX + buffer, 'big')
+
+
+def iter_block_bytes(blocks):
+    """Generator ngược của iter_blocks: bỏ byte 0x01 đầu mỗi khối, trả về các đoạn byte"""
+    for block in blocks:
+        data = int_to_bytes(block)
+        if data[:1] != BLOCK_PREFIX:
+            raise ValueError("Khối không hợp lệ (thiếu byte đầu 0x01)")
+        yield data[1:]
+
+
+def blocks_to_text(blocks):
+    """Ghép các khối về chuỗi, giải mã UTF-8 tăng dần (ký tự có thể nằm vắt qua hai khối)"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = [decoder.decode(chunk) for chunk in iter_block_bytes(blocks)]
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
@@ -1,38 +1,227 @@
+from functools import lru_cache
+
+import gmpy2
+from gmpy2 import mpz
+
+from NumberTheory import inverseModulo, inverseModuloBatch, sqrt_mod
+from ECC.Elliptic_Curve import Curve25519
+from SubDef.String_Int import text_to_int, int_to_text, iter_blocks, blocks_to_text
+
+"""
+Mã hóa thông điệp thành điểm trên đường cong (map-to-curve) và ngược lại
+- Đường cong Weierstrass y^2 = x^3 + ax + b: simplified SWU (RFC 9380), cần a, b khác 0
+- Curve25519 (Montgomery) dùng Elligator 2, Ed25519 qua ánh xạ song hữu tỷ từ Montgomery
+- Mỗi thông điệp chỉ tốn đúng một phép khai căn, không cần offset
+- Giải mã: tìm mọi u ánh xạ tới điểm rồi lấy u nhỏ nhất
+"""
+
+SWU_MARGIN = 64  # Số bit dự trữ: thông điệp < p / 2^64 nên gần như chắc chắn là nghịch ảnh nhỏ nhất
+
+
+def _is_square(a, p):
+    """a là số chính phương (kể cả 0) modulo p"""
+    return gmpy2.legendre(mpz(a) % p, p) != -1
+
+
+# ==================== Simplified SWU (Weierstrass) ====================
+
+@lru_cache(maxsize=32)
+def _swu_z(a, b, p):
+    """Chọn Z theo RFC 9380: Z không chính phương, Z != -1, g(b / (Z a)) chính phương"""
+    for k in range(1, p):
+        for z in (k, p - k):
+            if z == p - 1 or _is_square(z, p):
+                continue
+            x = b * inverseModulo(z * a % p, p) % p
+            if _is_square(x * x * x + a * x + b, p):
+                return z
+    raise ValueError("Không tìm được Z cho simplified SWU")
+
+
+def _swu_finish(curve, u, x1, z):
+    """Bước chung của SWU sau khi có x1: chọn x1 hoặc x2 = Z u^2 x1, khai căn một lần, chỉnh dấu y theo u"""
+    a, b, p = curve.a, curve.b, curve.p
+    gx = (x1 * x1 * x1 + a * x1 + b) % p
+    x = x1
+    if not _is_square(gx, p):
+        x = z * u * u * x1 % p
+        gx = (x * x * x + a * x + b) % p
+    y = sqrt_mod(gx, p)
+    if y % 2 != u % 2:
+        y = (-y) % p
+    return (int(x), int(y))
+
+
+def _swu_params(curve):
+    """(Z, -b/a, b/(Z a)) của đường cong, kiểm tra điều kiện a, b khác 0"""
+    a, b, p = curve.a % curve.p, curve.b % curve.p, curve.p
+    if a == 0 or b == 0:
+        raise ValueError("Simplified SWU cần a != 0 và b != 0")
+    z = _swu_z(a, b, p)
+    inv_a = inverseModulo(a, p)
+    return z, (-b) * inv_a % p, b * inverseModulo(z * a % p, p) % p
+
+
+def _swu_many(numbers, curve):
+    """Simplified SWU cho nhiều u, dùng chung một phép nghịch đảo"""
+    z, k, exceptional = _swu_params(curve)
+    p = curve.p
+    dens = [(z * z * u ** 4 + z * u * u) % p for u in numbers]
+    invs = inverseModuloBatch(dens, p)
+    points = []
+    for u, d, tv1 in zip(numbers, dens, invs):
+        x1 = exceptional if d == 0 else k * (1 + tv1) % p
+        points.append(_swu_finish(curve, u, x1, z))
+    return points
+
+
+def _swu_preimages(point, curve):
+    """Mọi u ánh xạ tới point qua SWU: giải phương trình bậc hai theo t = Z u^2 cho hai nhánh x1, x2"""
+    z, k, exceptional = _swu_params(curve)
+    p = curve.p
+    x = point[0] % p
+    w = x * inverseModulo(k, p) % p
+
+    ts = []
+    # Nhánh x = x1 = k (1 + 1 / (t^2 + t)):  t^2 + t - c = 0 với c = 1 / (w - 1)
+    if w != 1:
+        c = inverseModulo((w - 1) % p, p)
+        root = sqrt_mod(1 + 4 * c, p)
+        if root is not None:
+            ts += [(-1 + root) * inverseModulo(2, p) % p, (-1 - root) * inverseModulo(2, p) % p]
+    # Nhánh x = Z u^2 x1 = k (t + 1 / (t + 1)):  s^2 - (w + 1) s + 1 = 0 với s = t + 1
+    root = sqrt_mod((w + 1) * (w + 1) - 4, p)
+    if root is not None:
+        ts += [((w + 1 + root) * inverseModulo(2, p) - 1) % p, ((w + 1 - root) * inverseModulo(2, p) - 1) % p]
+    # Trường hợp ngoại lệ t^2 + t = 0
+    if x == exceptional:
+        ts += [0, p - 1]
+
+    candidates = set()
+    inv_z = inverseModulo(z, p)
+    for t in ts:
+        r = sqrt_mod(t * inv_z, p)
+        if r is not None:
+            candidates.update((int(r), int((-r) % p)))
+    return sorted(u for u in candidates if _swu_many([u], curve)[0] == tuple(point))
+
+
+# ==================== Elligator 2 (Curve25519 / Ed25519) ====================
+
+@lru_cache(maxsize=2)
+def _edwards_scale(p, A):
+    """Hằng số sqrt(-(A + 2)) của ánh xạ Montgomery <-> Edwards (RFC 7748)"""
+    return int(sqrt_mod(-(A + 2), p))
+
+
+def _elligator_many(numbers, curve):
+    """Elligator 2 với Z = 2 cho nhiều r: w = -A / (1 + 2 r^2), chọn w hoặc -w - A theo tính chính phương"""
+    p, A = curve.p, 486662
+    invs = inverseModuloBatch([(1 + 2 * r * r) % p for r in numbers], p)
+    points = []
+    for inv in invs:
+        w = (-A) * inv % p
+        gw = (w * w * w + A * w * w + w) % p
+        if _is_square(gw, p):
+            u, parity = w, 0
+        else:
+            u, parity = (-w - A) % p, 1
+            gw = (u * u * u + A * u * u + u) % p
+        v = sqrt_mod(gw, p)
+        if v % 2 != parity:
+            v = (-v) % p
+        points.append((int(u), int(v)))
+
+    if curve.curve_type != "ed25519":
+        return points
+    # Montgomery (u, v) -> Edwards (x, y) = (c u / v, (u - 1) / (u + 1))
+    c = _edwards_scale(p, A)
+    invs = inverseModuloBatch([q for u, v in points for q in (v, u + 1)], p)
+    return [(c * u * invs[2 * i] % p, (u - 1) * invs[2 * i + 1] % p) for i, (u, v) in enumerate(points)]
+
+
+def _elligator_preimages(point, curve):
+    """Nghịch ảnh r <= (p - 1) / 2 của Elligator 2: nhánh xác định bởi tính chẵn lẻ của v"""
+    p, A = curve.p, 486662
+    if curve.curve_type == "ed25519":
+        # Edwards (x, y) -> Montgomery u = (1 + y) / (1 - y), v = c u / x
+        x, y = point
+        u = (1 + y) * inverseModulo((1 - y) % p, p) % p
+        v = _edwards_scale(p, A) * u * inverseModulo(x % p, p) % p
+    else:
+        u, v = point
+    w = u if v % 2 == 0 else (-u - A) % p
+    if w == 0:
+        return []
+    r = sqrt_mod((-A * inverseModulo(w, p) - 1) * inverseModulo(2, p), p)
+    if r is None:
+        return []
+    r = int(min(r, p - r))
+    return [r] if _elligator_many([r], curve)[0] == tuple(point) else []
+
+
+# ==================== API ====================
+
+def encoding_bound(curve):
+    """Các số nguyên mã hóa được phải nhỏ hơn giá trị này"""
+    if isinstance(curve, Curve25519):
+        return 1 << (curve.p.bit_length() - 2)  # r <= (p - 1) / 2
+    bits = curve.p.bit_length()
+    return 1 << max(bits - min(SWU_MARGIN, bits // 4), 1)
+
+
+def encode_many(numbers, curve):
+    """Ánh xạ nhiều số nguyên 0 < m < encoding_bound(curve) thành điểm, dùng chung phép nghịch đảo"""
+    numbers = [mpz(m) for m in numbers]
+    bound = encoding_bound(curve)
+    if any(m <= 0 or m >= bound for m in numbers):
+        raise ValueError(f"Số cần mã hóa phải nằm trong (0, {bound})")
+    if isinstance(curve, Curve25519):
+        return _elligator_many(numbers, curve)
+    points = _swu_many(numbers, curve)
+    if curve.p.bit_length() // 4 >= SWU_MARGIN:
+        return points
+    # Đường cong nhỏ không đủ bit dự trữ: kiểm tra m là nghịch ảnh nhỏ nhất để giải mã được duy nhất
+    for m, point in zip(numbers, points):
+        if _swu_preimages(point, curve)[0] != m:
+            raise ValueError("Số này không phải nghịch ảnh nhỏ nhất của điểm, không giải mã được duy nhất")
+    return points
+
+
+def encode_to_point(number, curve):
+    """Ánh xạ một số nguyên thành điểm trên đường cong"""
+    return encode_many([number], curve)[0]
+
+
+def decode_point(point, curve):
+    """Nghịch đảo encode_to_point: nghịch ảnh u nhỏ nhất của điểm"""
+    if isinstance(curve, Curve25519):
+        candidates = _elligator_preimages(point, curve)
+    else:
+        candidates = _swu_preimages(point, curve)
+    if not candidates:
+        raise ValueError("Điểm không nằm trong ảnh của phép mã hóa")
+    return candidates[0]
+
 
 def string_to_point(text, curve):
-    """
-    Chuyển đổi chuỗi thành điểm trên đường cong
-    Phương pháp: Encode text thành số, sau đó tìm điểm có x = số đó
-    """
-    # Chuyển text thành số
-    number = 0
-    for char in text:
-        number = number * 256 + ord(char)
-
-    # Tìm điểm có x gần với number
-    for offset in range(100):  # Thử offset 0-99
-        x = (number + offset) % curve.p
-        y_squared = (pow(x, 3, curve.p) + curve.a * x + curve.b) % curve.p
-
-        y = curve._mod_sqrt(y_squared, curve.p)
-        if y is not None:
-            return (x, y), offset
-
-    raise ValueError("Không thể encode text thành điểm!")
-
-
-def point_to_string(point, offset, curve):
-    """
-    Chuyển đổi điểm trên đường cong thành chuỗi
-    """
-    x, y = point
-    # Trừ offset để lấy lại số gốc
-    number = (x - offset) % curve.p
-
-    # Chuyển số thành text
-    chars = []
-    while number > 0:
-        chars.append(chr(number % 256))
-        number //= 256
-
-    return ''.join(reversed(chars))
+    """Chuyển chuỗi thành một điểm trên đường cong (chuỗi phải đủ ngắn, xem string_to_points)"""
+    number = text_to_int(text)
+    if number >= encoding_bound(curve):
+        raise ValueError("Chuỗi quá dài cho một điểm, dùng string_to_points")
+    return encode_to_point(number, curve)
+
+
+def point_to_string(point, curve):
+    """Chuyển điểm của string_to_point về chuỗi"""
+    return int_to_text(decode_point(point, curve))
+
+
+def string_to_points(text, curve):
+    """Chuyển chuỗi dài tùy ý thành danh sách điểm (mỗi khối một điểm, mã hóa theo lô)"""
+    return encode_many(iter_blocks(text, encoding_bound(curve)), curve)
+
+
+def points_to_string(points, curve):
+    """Ghép các điểm của string_to_points về chuỗi"""
+    return blocks_to_text(decode_point(point, curve) for point in points)
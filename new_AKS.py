@@ -1,11 +1,18 @@
-import math
+import json
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
 
 import gmpy2
 from gmpy2 import mpz
 import numpy as np
 
+from NumberTheory import perfect_power
+from SubDef.SD_AKS_Parameters import (congruence_event, congruence_limit, estimate_bit_operations, find_r,
+                                      progress_event)
+from SubDef.SD_Polynomial import (NTT_MAX_N, linear_congruence_failures, ntt_mul_mod, poly_mul_mod,
+                                  poly_pow_linear, poly_pow_mod)
+
 """ 
 Thuật toán AKS được tối ưu hóa
 - Sử dụng đa luồng/đa tiến trình
@@ -15,8 +22,9 @@ Thuật toán AKS được tối ưu hóa
 
 # ==================== Cấu hình ====================
 
-# Kích hoạt gmpy2 cache
-gmpy2.get_context().precision = 200
+# Backend nhân đa thức: "kronecker" (gmpy2, mặc định) hoặc "ntt" (NumPy uint64, n < 2^62)
+# Với r vài nghìn, một phép nhân số lớn của GMP vẫn nhanh hơn NTT NumPy khoảng 2 lần
+POLY_BACKEND = "kronecker"
 
 # ==================== Các hàm tiện ích ====================
 
@@ -32,63 +40,23 @@ def powmod_fast(base, exp, mod):
 
 def is_perfect_power(n):
     """
-    Kiểm tra lũy thừa hoàn hảo với gmpy2
-    Nhanh hơn 10-50 lần so với thuần Python
+    Kiểm tra lũy thừa hoàn hảo chính xác: chỉ thử số mũ nguyên tố, sàng bằng số dư trước khi gọi iroot
     """
-    if n < 2:
-        return False
-
-    n_mpz = mpz(n)
-
-    # gmpy2 có hàm is_power tích hợp
-    if gmpy2.is_power(n_mpz):
-        return True
-
-    # Kiểm tra thêm với iroot cho chắc chắn
-    log2n = n_mpz.bit_length()
-
-    for b in range(2, min(log2n, 64)):
-        root, exact = gmpy2.iroot(n_mpz, b)
-        if exact:
-            return True
-
-    return False
+    return perfect_power(n) is not None
 
 
 def find_r_optimized(n):
     """
     Tìm r tối ưu hơn với giới hạn trên
+    Cấp của n được tính theo cả khối r cùng lúc (SubDef.SD_AKS_Parameters)
     """
     n = mpz(n)
     log2n = n.bit_length()
-    log2n_sq = log2n ** 2
 
     # Giới hạn trên cho r theo lý thuyết AKS
-    max_r = min(mpz(log2n ** 5), n - 1)
-
-    r = 2
-    while r <= max_r:
-        r = mpz(r)
-        if gmpy2.gcd(n, r) != 1:
-            r += 1
-            continue
-
-        # Tính order của n mod r
-        k = 1
-        result = n % r
-
-        while k <= log2n_sq:
-            if result == 1:
-                break
-            result = (result * n) % r
-            k += 1
-
-        if k > log2n_sq:
-            return r
-
-        r += 1
+    max_r = int(min(mpz(log2n ** 5), n - 1))
 
-    return r
+    return mpz(find_r(n, log2n ** 2, max_r))
 
 
 # ==================== Phép toán đa thức tối ưu ====================
@@ -116,35 +84,50 @@ class PolyMod:
         self.coeffs = np.mod(self.coeffs, n)
 
     def __mul__(self, other):
-        """Nhân hai đa thức - Tối ưu với FFT cho r lớn"""
-        res = np.zeros(self.r, dtype=object)
+        """Nhân hai đa thức - thế Kronecker: một phép nhân số lớn gmpy2 (GMP dùng FFT khi r lớn)"""
+        res = poly_mul_mod(self.coeffs.tolist(), other.coeffs.tolist(), self.r, self.n)
+        return PolyMod(np.array(res, dtype=object), self.r, self.n)
 
-        # Tối ưu: chỉ xử lý các hệ số khác 0
-        nonzero_self = np.nonzero(self.coeffs)[0]
-        nonzero_other = np.nonzero(other.coeffs)[0]
+    def __pow__(self, exp):
+        """Lũy thừa theo cửa sổ trượt; với cơ sở x + a mỗi bước nhân chỉ là dịch vòng O(r)"""
+        coeffs = self.coeffs.tolist()
+        if self.r > 1 and coeffs[1] == 1 and not any(coeffs[2:]):
+            res = poly_pow_linear(coeffs[0], exp, self.r, self.n)
+        else:
+            res = poly_pow_mod(coeffs, exp, self.r, self.n)
+        return PolyMod(np.array(res, dtype=object), self.r, self.n)
 
-        for i in nonzero_self:
-            c1 = int(self.coeffs[i])
-            for j in nonzero_other:
-                c2 = int(other.coeffs[j])
-                coeff = (c1 * c2) % self.n
-                power = (i + j) % self.r
-                res[power] = (res[power] + coeff) % self.n
+    def __eq__(self, other):
+        """So sánh hai đa thức"""
+        return np.array_equal(self.coeffs, other.coeffs)
 
-        return PolyMod(res, self.r, self.n)
+
+class PolyModNTT(PolyMod):
+    """PolyMod với hệ số uint64 (cần n < 2^62), nhân bằng NTT đa modulo của NumPy"""
+
+    __slots__ = []
+
+    def __init__(self, coeffs, r, n):
+        self.r = r
+        self.n = n
+        coeffs = np.asarray(coeffs)[:r]
+        if coeffs.dtype != np.uint64:
+            coeffs = np.array([int(c) % n for c in coeffs], dtype=np.uint64)
+        else:
+            coeffs = coeffs % np.uint64(n)
+        self.coeffs = np.zeros(r, dtype=np.uint64)
+        self.coeffs[:len(coeffs)] = coeffs
 
     def __pow__(self, exp):
-        """Lũy thừa nhanh bằng binary exponentiation"""
+        """Lũy thừa nhanh bằng binary exponentiation, mỗi phép nhân là một NTT"""
+        cls = type(self)
+        one = np.zeros(self.r, dtype=self.coeffs.dtype)
+        one[0] = 1
+        result = cls(one, self.r, self.n)
         if exp == 0:
-            res = np.zeros(self.r, dtype=object)
-            res[0] = 1
-            return PolyMod(res, self.r, self.n)
+            return result
 
-        result_coeffs = np.zeros(self.r, dtype=object)
-        result_coeffs[0] = 1
-        result = PolyMod(result_coeffs, self.r, self.n)
-
-        base = PolyMod(self.coeffs, self.r, self.n)
+        base = cls(self.coeffs, self.r, self.n)
 
         exp_mpz = mpz(exp)
 
@@ -156,37 +139,161 @@ class PolyMod:
 
         return result
 
-    def __eq__(self, other):
-        """So sánh hai đa thức"""
-        return np.array_equal(self.coeffs, other.coeffs)
+    def __mul__(self, other):
+        """Nhân hai đa thức bằng NTT, chu kỳ x^r = 1 gập sẵn trong ntt_mul_mod"""
+        b = self.coeffs if other is self else other.coeffs
+        return PolyModNTT(ntt_mul_mod(self.coeffs, b, self.r, self.n), self.r, self.n)
+
+
+def poly_class(n):
+    """Chọn backend đa thức theo POLY_BACKEND, NTT chỉ dùng được khi n < 2^62"""
+    return PolyModNTT if POLY_BACKEND == "ntt" and n < NTT_MAX_N else PolyMod
+
+
+def _congruence_holds(a, n, r, cls, power):
+    """(x + a)^n == x^n + a mod (x^r - 1, n), với power = n mod r"""
+    poly_left = cls(np.array([a, 1], dtype=object), r, n) ** n
+    coeffs_right = np.zeros(r, dtype=object)
+    coeffs_right[0] = a
+    coeffs_right[power] = (coeffs_right[power] + 1) % n
+    return poly_left == cls(coeffs_right, r, n)
 
 
 def check_polynomial_congruence(args):
     """
     Hàm kiểm tra đồng dư đa thức cho một giá trị a
-    Được thiết kế để chạy song song
+    Lỗi tính toán được ném ra ngoài, không bao giờ bị coi là n hợp số
     """
     a, n, r = args
+    return (a, _congruence_holds(a, n, r, poly_class(n), int(mpz(n) % r)))
 
-    try:
-        # Chuyển sang mpz để tính toán nhanh hơn
-        a_mpz = mpz(a)
-        n_mpz = mpz(n)
 
-        # (x + a)^n mod (x^r - 1, n)
-        coeffs_left = np.array([a, 1], dtype=object)
-        poly_left = PolyMod(coeffs_left, r, n) ** n
+# ==================== Bước 5 song song, có checkpoint ====================
+
+CHUNK_SIZE = 8  # Số giá trị a liên tiếp trong một work unit
+
+_state = None
+
+
+def _init_worker(n, r, backend):
+    """Khởi tạo mỗi worker một lần: n, r, backend đa thức và x^n mod (x^r - 1) = x^(n mod r)"""
+    global _state, POLY_BACKEND
+    POLY_BACKEND = backend
+    n, r = mpz(n), int(r)
+    _state = (n, r, poly_class(n), int(n % r))
+
 
-        # x^n + a mod (x^r - 1, n)
-        power = int(n_mpz % r)
-        coeffs_right = np.zeros(r, dtype=object)
-        coeffs_right[0] = a
-        coeffs_right[power] = (coeffs_right[power] + 1) % n
-        poly_right = PolyMod(coeffs_right, r, n)
+def _check_range(bounds):
+    """
+    Kiểm tra các a trong [lo, hi]: trả về (lo, hi, a đầu tiên thất bại hoặc None).
+    Ngoại lệ không bị nuốt: imap_unordered ném lại ở process chính và verify_congruences dừng
+    """
+    lo, hi = bounds
+    n, r, cls, power = _state
+    if cls is PolyMod:
+        # Cả đoạn là một lô: chung lần duyệt bit của n và vế phải x^(n mod r) + a
+        failures = linear_congruence_failures(range(lo, hi + 1), n, r)
+        return (lo, hi, failures[0] if failures else None)
+    for a in range(lo, hi + 1):
+        if not _congruence_holds(a, n, r, cls, power):
+            return (lo, hi, a)
+    return (lo, hi, None)
+
+
+def _merge_ranges(ranges):
+    """Gộp các đoạn [lo, hi] chồng nhau hoặc kề nhau"""
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def _load_checkpoint(path, n, r, limit_a):
+    """Các đoạn a đã kiểm tra xong cho đúng (n, r, limit_a), rỗng nếu file không có hoặc không khớp"""
+    if path is None or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("n") != str(n) or data.get("r") != int(r) or data.get("limit_a") != limit_a:
+        return []
+    return _merge_ranges(data.get("verified", []))
+
+
+def _save_checkpoint(path, n, r, limit_a, verified):
+    """Ghi checkpoint qua file tạm rồi os.replace để không bao giờ để lại file hỏng"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"n": str(n), "r": int(r), "limit_a": limit_a, "verified": verified}, f)
+    os.replace(tmp, path)
+
+
+def _pending_chunks(limit_a, verified, chunk_size):
+    """Chia các a trong [1, limit_a] chưa kiểm tra thành các đoạn liên tiếp dài tối đa chunk_size"""
+    chunks, a = [], 1
+    for lo, hi in verified + [[limit_a + 1, limit_a + 1]]:
+        while a < lo:
+            end = min(a + chunk_size - 1, lo - 1)
+            chunks.append((a, end))
+            a = end + 1
+        a = max(a, hi + 1)
+    return chunks
+
+
+def verify_congruences(n, r, limit_a, max_workers=None, checkpoint=None, chunk_size=CHUNK_SIZE, log=None,
+                       progress=None):
+    """
+    Bước 5 của AKS cho mọi 1 <= a <= limit_a, chia thành các đoạn a liên tiếp.
+
+    Args:
+        max_workers: số process (1 để chạy tuần tự, mặc định số CPU)
+        checkpoint: đường dẫn file JSON ghi các đoạn a đã kiểm tra xong; chạy lại với
+            cùng file sẽ bỏ qua các đoạn này (chỉ dùng khi n, r, limit_a khớp)
+        log: hàm in thông báo checkpoint (tùy chọn), tiến độ từng work unit đi qua progress
+        progress: hàm nhận sự kiện tiến độ sau mỗi work unit (congruence_event: a, multiplies, eta, ...)
+
+    Returns:
+        a đầu tiên thất bại, hoặc None nếu mọi a đều thỏa mãn
+
+    Raises:
+        Lỗi tính toán trong worker được ném lại nguyên vẹn (không kết luận n là hợp số)
+    """
+    verified = _load_checkpoint(checkpoint, n, r, limit_a)
+    chunks = _pending_chunks(limit_a, verified, chunk_size)
+    done = limit_a - sum(hi - lo + 1 for lo, hi in chunks)
+    if log and done:
+        log(f"  Checkpoint: đã kiểm tra {done}/{limit_a} giá trị a")
 
-        return (a, poly_left == poly_right)
-    except Exception as e:
-        return (a, False)
+    if max_workers is None:
+        max_workers = mp.cpu_count()
+    args = (int(n), int(r), POLY_BACKEND)
+    started, checked = time.perf_counter(), 0
+    pool = None
+    try:
+        if max_workers > 1 and len(chunks) > 1:
+            pool = mp.Pool(min(max_workers, len(chunks)), initializer=_init_worker, initargs=args)
+            results = pool.imap_unordered(_check_range, chunks)
+        else:
+            _init_worker(*args)
+            results = map(_check_range, chunks)
+
+        for lo, hi, failed_a in results:
+            if failed_a is not None:
+                return failed_a
+            done += hi - lo + 1
+            checked += hi - lo + 1
+            verified = _merge_ranges(verified + [[lo, hi]])
+            if checkpoint is not None:
+                _save_checkpoint(checkpoint, n, r, limit_a, verified)
+            if progress is not None:
+                progress(congruence_event(n, r, done, limit_a, time.perf_counter() - started, checked))
+    finally:
+        # terminate dừng cả các work unit đang chạy dở, không chỉ các unit chưa bắt đầu
+        if pool is not None:
+            pool.terminate()
+    return None
 
 
 # ==================== Thuật toán AKS chính ====================
@@ -236,7 +343,8 @@ def miller_rabin_fast(n, k=10):
 
     return True
 
-def is_prime_aks_parallel(n, verbose=True, max_workers=None, use_prefilter=True):
+def is_prime_aks_parallel(n, verbose=False, max_workers=None, use_prefilter=True, checkpoint=None,
+                          bound_method="exact", progress=None):
     """
     Thuật toán AKS với xử lý song song
 
@@ -244,12 +352,26 @@ def is_prime_aks_parallel(n, verbose=True, max_workers=None, use_prefilter=True)
         n: Số cần kiểm tra
         verbose: In thông tin debug
         max_workers: Số worker processes (mặc định: số CPU cores)
+        checkpoint: File JSON lưu các đoạn a đã kiểm tra ở bước 5, cho phép chạy tiếp sau khi bị ngắt
+        bound_method: Số giá trị a ở bước 5, "exact" hoặc "classic" (xem congruence_limit)
+        progress: Hàm nhận sự kiện tiến độ (dict: phase, a, limit_a, multiplies, eta, ...)
     """
 
     def log(msg):
         if verbose:
             print(msg)
 
+    def emit(phase, **fields):
+        if progress is not None:
+            progress(progress_event(phase, n, **fields))
+
+    result = _aks_steps(n, log, emit, max_workers, use_prefilter, checkpoint, bound_method, progress)
+    emit("done", result=result)
+    return result
+
+
+def _aks_steps(n, log, emit, max_workers, use_prefilter, checkpoint, bound_method, progress):
+    """Các bước của is_prime_aks_parallel (log: in ra màn hình, emit: phát sự kiện), trả về True/False"""
     log(f"{'='*60}")
     log(f"KIỂM TRA NGUYÊN TỐ AKS: n = {n:,}")
     log(f"{'='*60}")
@@ -269,6 +391,7 @@ def is_prime_aks_parallel(n, verbose=True, max_workers=None, use_prefilter=True)
 
     # Pre-filter với Miller-Rabin (tùy chọn)
     if use_prefilter:
+        emit("prefilter")
         log("\n[Pre-filter] Miller-Rabin test...")
         if not miller_rabin_fast(n, k=10):
             log("❌ Không vượt qua Miller-Rabin")
@@ -276,6 +399,7 @@ def is_prime_aks_parallel(n, verbose=True, max_workers=None, use_prefilter=True)
         log("✓ Vượt qua Miller-Rabin (có thể là nguyên tố)")
 
     # Bước 1: Kiểm tra lũy thừa hoàn hảo
+    emit("perfect_power")
     log("\n[Bước 1] Kiểm tra lũy thừa hoàn hảo...")
     if is_perfect_power(n):
         log("❌ n là lũy thừa hoàn hảo")
@@ -283,11 +407,13 @@ def is_prime_aks_parallel(n, verbose=True, max_workers=None, use_prefilter=True)
     log("✓ Không là lũy thừa hoàn hảo")
 
     # Bước 2: Tìm r
+    emit("find_r")
     log("\n[Bước 2] Tìm giá trị r...")
     r = find_r_optimized(n)
-    # log(f"✓ Tìm được r = {r:,}")
+    log(f"✓ Tìm được r = {int(r):,}")
 
     # Bước 3: Kiểm tra GCD
+    emit("gcd", r=int(r))
     log(f"\n[Bước 3] Kiểm tra GCD với các số từ 2 đến {r}...")
     for a in range(2, min(r + 1, n)):
         g = gcd_cached(a, n)
@@ -304,42 +430,17 @@ def is_prime_aks_parallel(n, verbose=True, max_workers=None, use_prefilter=True)
 
     # Bước 5: Kiểm tra đồng dư đa thức (song song)
     log(f"\n[Bước 5] Kiểm tra đồng dư đa thức (đa luồng)...")
-    log2n = n.bit_length()
-    limit_a = min(int(math.sqrt(r) * log2n), 1000)  # Giới hạn để tránh quá lâu
+    limit_a = congruence_limit(n, r, bound_method)
 
-    log(f"Giới hạn a: 1 đến {limit_a}")
+    log(f"Giới hạn a: 1 đến {limit_a} (cận {bound_method})")
+    log(f"Ước lượng: {estimate_bit_operations(n, r, limit_a):.3g} phép toán bit")
     log(f"Số CPU cores: {mp.cpu_count()}")
 
-    if max_workers is None:
-        max_workers = mp.cpu_count()
-
-    # Tạo danh sách các tham số
-    tasks = [(a, n, r) for a in range(1, limit_a + 1)]
-
-    # Xử lý song song
-    failed = False
-    completed = 0
-
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(check_polynomial_congruence, task): task
-                  for task in tasks}
-
-        for future in as_completed(futures):
-            a, result = future.result()
-            completed += 1
-
-            if not result:
-                log(f"❌ Thất bại tại a = {a}")
-                failed = True
-                # Hủy các task còn lại
-                for f in futures:
-                    f.cancel()
-                break
-
-            if completed % 10 == 0 or completed == len(tasks):
-                log(f"  Progress: {completed}/{len(tasks)} ({100*completed//len(tasks)}%)")
-
-    if failed:
+    emit("congruence", r=int(r), a=0, limit_a=limit_a, multiplies=0, elapsed=0.0, rate=0.0, eta=None)
+    failed_a = verify_congruences(n, r, limit_a, max_workers=max_workers, checkpoint=checkpoint, log=log,
+                                  progress=progress)
+    if failed_a is not None:
+        log(f"❌ Thất bại tại a = {failed_a}")
         return False
 
     # Bước 6: Kết luận
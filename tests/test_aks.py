@@ -0,0 +1,9 @@
+from AKS_Algorithm import is_prime_aks
+
+
+def test_is_prime_aks_is_quiet_by_default(capsys):
+    events = []
+    assert is_prime_aks(1000003, progress=events.append) is True
+    assert is_prime_aks(1000001) is False
+    assert capsys.readouterr().out == ""
+    assert events[-1]["phase"] == "done" and events[-1]["result"] is True
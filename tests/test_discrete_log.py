@@ -0,0 +1,53 @@
+import random
+
+import gmpy2
+
+import NumberTheory
+from NumberTheory import babyStepGiantStep, discreteLog, moduloPower, pohligHellman, pollardRhoLog
+
+SAFE_PRIME = 2097779  # 2q + 1, q = 1048889 nguyên tố
+SUBGROUP_ORDER = 1048889
+SMOOTH_PRIME = 14 * 614889782588491410 + 1  # p - 1 = 2^2 * 3 * 5 * 7^2 * 11 * ... * 47
+
+
+def test_baby_step_giant_step():
+    p = 1000003
+    rng = random.Random(0)
+    for _ in range(20):
+        x = rng.randrange(p - 1)
+        assert moduloPower(2, babyStepGiantStep(2, moduloPower(2, x, p), p, p - 1), p) == moduloPower(2, x, p)
+    # 2 không chính phương nên không thuộc nhóm con cấp q sinh bởi 4
+    assert babyStepGiantStep(4, 2, SAFE_PRIME, SUBGROUP_ORDER) is None
+
+
+def test_pollard_rho_log():
+    rng = random.Random(1)
+    for _ in range(3):
+        x = rng.randrange(SUBGROUP_ORDER)
+        h = moduloPower(4, x, SAFE_PRIME)
+        assert pollardRhoLog(4, h, SAFE_PRIME, SUBGROUP_ORDER, use_parallel=False) == x
+
+
+def test_discrete_log_forced_rho(monkeypatch):
+    monkeypatch.setattr(NumberTheory, "BSGS_MAX_ORDER", 2 ** 8)
+    monkeypatch.setattr(NumberTheory, "babyStepGiantStep", None)  # Nhóm con cấp q chỉ được đi rho
+    x = 777777
+    h = moduloPower(4, x, SAFE_PRIME)
+    assert discreteLog(4, h, SAFE_PRIME, SUBGROUP_ORDER, {SUBGROUP_ORDER: 1}, use_parallel=False) == x
+    assert discreteLog(4, 2, SAFE_PRIME, SUBGROUP_ORDER, {SUBGROUP_ORDER: 1}, use_parallel=False) is None
+
+
+def test_pohlig_hellman_smooth_order():
+    p = SMOOTH_PRIME
+    assert gmpy2.is_prime(p)
+    rng = random.Random(2)
+    for g in (3, 5, 7):  # không nhất thiết là căn nguyên thủy
+        x = rng.randrange(p - 1)
+        h = moduloPower(g, x, p)
+        y = discreteLog(g, h, p, use_parallel=False)
+        assert y is not None and moduloPower(g, y, p) == h
+    order, factorization = 2 ** 2 * 3 * 7 ** 2, {2: 2, 3: 1, 7: 2}
+    g = next(g for g in (moduloPower(a, (p - 1) // order, p) for a in range(2, 100))
+             if all(moduloPower(g, order // q, p) != 1 for q in factorization))  # cấp đúng bằng order
+    for x in (0, 1, 300, order - 1):
+        assert pohligHellman(g, moduloPower(g, x, p), p, order, factorization, use_parallel=False) == x
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from ECC.EC_ElGamal.EC_ElGamal import ElGamal_ECC_encrypt_text, ElGamal_ECC_decrypt_text
+from ECC.Elliptic_Curve import EllipticCurve
+from SubDef.String_Int import block_size
+from SubDef.String_Point import encoding_bound
+
+# NIST P-256
+P256 = EllipticCurve(
+    -3,
+    0x5ac635d8aa3a93e7b3ebbd55769886bc651d06b0cc53b0f63bce3c3e27d2604b,
+    0xffffffff00000001000000000000000000000000ffffffffffffffffffffffff,
+)
+G = (0x6b17d1f2e12c4247f8bce6e563a440f277037d812deb33a0f4a13945d898c296,
+     0x4fe342e2fe1a7f9b8ee7eb4a7c0f9e162bce33576b315ececbb6406837bf51f5)
+N = 0xffffffff00000000ffffffffffffffffbce6faada7179e84f3b9cac2fc632551
+
+
+@pytest.fixture
+def keys():
+    private_key = random.Random(0).randrange(1, N)
+    return private_key, P256.point_multiply(private_key, G)
+
+
+def _round_trip(text, keys, tmp_path):
+    private_key, public_key = keys
+    files = {"output_file": str(tmp_path / "encrypted.txt")}
+    cypher = ElGamal_ECC_encrypt_text(text, P256, G, public_key, N, **files)
+    direct = ElGamal_ECC_decrypt_text(cypher, curve=P256, private_key=private_key,
+                                      output_file=str(tmp_path / "decrypted.txt"))
+    from_file = ElGamal_ECC_decrypt_text(curve=P256, private_key=private_key,
+                                         cypher_file=files["output_file"],
+                                         output_file=str(tmp_path / "decrypted.txt"))
+    return cypher, direct, from_file
+
+
+@pytest.mark.parametrize("extra", [-1, 0, 1, 8, 40])
+def test_text_round_trip_around_capacity(extra, keys, tmp_path):
+    size = block_size(encoding_bound(P256))
+    text = "x" * (size + extra)
+    cypher, direct, from_file = _round_trip(text, keys, tmp_path)
+    assert direct == from_file == text
+    assert len(cypher) == -(-len(text) // size)
+
+
+@pytest.mark.parametrize("text", ["Nguyễn Hải Nam " * 5, "\x00ab", "\x00", "ab\x00"])
+def test_text_round_trip_multibyte_and_nul(text, keys, tmp_path):
+    assert _round_trip(text, keys, tmp_path)[1:] == (text, text)
+
+
+def test_empty_text(keys, tmp_path):
+    cypher, direct, from_file = _round_trip("", keys, tmp_path)
+    assert cypher == [] and direct == from_file == ""
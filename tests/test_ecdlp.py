@@ -0,0 +1,59 @@
+import random
+
+from ECC import ECDLP
+from ECC.Elliptic_Curve import EllipticCurve
+
+
+def _prime_order_point(a, b, p):
+    """Điểm G có cấp nguyên tố lớn nhất trên y^2 = x^3 + ax + b (mod p), đếm điểm trực tiếp"""
+    curve = EllipticCurve(a, b, p)
+    squares = {}
+    for y in range(p):
+        squares.setdefault(y * y % p, []).append(y)
+    points = [(x, y) for x in range(p) for y in squares.get((x ** 3 + a * x + b) % p, [])]
+    total = len(points) + 1
+    n, m = total, 2
+    factors = []
+    while m * m <= n:
+        while n % m == 0:
+            factors.append(m)
+            n //= m
+        m += 1
+    if n > 1:
+        factors.append(n)
+    order = max(factors)
+    for P in points:
+        G = curve.point_multiply(total // order, P)
+        if G is not None:
+            return curve, G, order
+
+
+def test_rho_distinguished_points_match_coefficients():
+    curve, G, order = _prime_order_point(2, 7, 6421)
+    k = random.Random(1).randrange(1, order)
+    Q = curve.point_multiply(k, G)
+    rng = random.Random(2)
+    steps = [(rng.randrange(order), rng.randrange(order)) for _ in range(ECDLP.PARTITIONS)]
+    ECDLP._init_worker(curve.a, curve.b, curve.p, G, Q, steps, "rho", order, None, 2)
+
+    found, ops = ECDLP._walk_task(3)
+    assert len(found) >= ECDLP.DP_PER_TASK and ops > 0
+    for P, a, b in found:
+        assert curve.point_add(curve.point_multiply(a, G), curve.point_multiply(b, Q)) == P
+
+
+def test_solve_ecdlp_rho_and_kangaroo():
+    curve, G, order = _prime_order_point(2, 7, 6421)
+    for k in (1, 17, order - 1):
+        Q = curve.point_multiply(k, G)
+        assert ECDLP.solve_ecdlp(curve, G, Q, order=order, use_parallel=False) == k
+        assert ECDLP.solve_ecdlp(curve, G, Q, bound=order, use_parallel=False) % order == k
+
+
+def test_solve_ecdlp_small_order():
+    # Cấp nhỏ: bước ngẫu nhiên a_j G + b_j Q rất dễ rơi vào điểm vô cực
+    curve, G, order = _prime_order_point(2, 4, 6421)
+    assert order == 37
+    for k in range(1, order):
+        Q = curve.point_multiply(k, G)
+        assert ECDLP.solve_ecdlp(curve, G, Q, order=order, use_parallel=False) == k
@@ -0,0 +1,24 @@
+import gmpy2
+
+from SubDef.SD_ECM import ecm_factor, ecm_one_curve, primes_upto, stage1_exponent
+
+
+def test_stage1_exponent_covers_prime_powers():
+    assert primes_upto(30) == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    e = stage1_exponent(100)
+    assert e % (2 ** 6 * 3 ** 4 * 5 ** 2 * 7 ** 2 * 97) == 0
+
+
+def test_ecm_finds_medium_factor():
+    p, q = gmpy2.next_prime(10 ** 9), gmpy2.next_prime(10 ** 25)
+    n = p * q
+    d = ecm_factor(n, B1=2000, curves=200, use_parallel=False)
+    assert d in (p, q)
+
+
+def test_ecm_one_curve_smooth_order():
+    # Tìm sigma mà nhóm điểm modulo p có cấp B1-smooth: một đường cong là đủ để tách
+    p, q = gmpy2.next_prime(10 ** 6), gmpy2.next_prime(10 ** 20)
+    hits = [ecm_one_curve(p * q, sigma, 200, 200) for sigma in range(6, 200)]
+    assert any(d == p for d in hits)
+    assert all(d is None or d in (p, q) for d in hits)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from SubDef import SD_Primitive_Root
+from SubDef.SD_Primitive_Root import factorize
+
+
+def _product(factors):
+    result = 1
+    for p, e in factors.items():
+        result *= int(p) ** e
+    return result
+
+
+def test_factorize_small_composites_skip_pm1(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("p-1 / p+1 không được chạy khi rho đã tách được n nhỏ")
+
+    monkeypatch.setattr(SD_Primitive_Root, "pollard_pm1", fail)
+    monkeypatch.setattr(SD_Primitive_Root, "williams_pp1", fail)
+    SD_Primitive_Root._factorize_cached.cache_clear()
+    assert factorize(53 * 59) == {53: 1, 59: 1}
+    rng = random.Random(0)
+    for _ in range(50):
+        n = rng.getrandbits(40) | 1
+        assert _product(factorize(n)) == n
+    SD_Primitive_Root._factorize_cached.cache_clear()
+
+
+def test_factorize_large_smooth_factor():
+    # p - 1 = 2^2 * 3 * 5 * 7^2 * ... * 47 smooth nên p-1 tách được ngay, q = 2^89 + 29 nguyên tố
+    p, q = 14 * 614889782588491410 + 1, (1 << 89) + 29
+    assert SD_Primitive_Root.pollard_pm1(p * q) == p
+    SD_Primitive_Root._factorize_cached.cache_clear()
+    assert factorize(p * q) == {p: 1, q: 1}
+
+
+@pytest.mark.parametrize("n", [0, -1, -15])
+def test_factorize_rejects_non_positive(n):
+    with pytest.raises(ValueError):
+        factorize(n)
+
+
+def test_factorize_one():
+    assert factorize(1) == {}
@@ -0,0 +1,35 @@
+import pytest
+
+import new_AKS
+
+
+def _broken(*args, **kwargs):
+    raise TypeError("lỗi tính toán giả lập")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_verify_congruences_propagates_errors(monkeypatch, max_workers):
+    monkeypatch.setattr(new_AKS, "linear_congruence_failures", _broken)
+    with pytest.raises(TypeError):
+        new_AKS.verify_congruences(1000003, 23, 40, max_workers=max_workers, chunk_size=8)
+    with pytest.raises(TypeError):
+        new_AKS.is_prime_aks_parallel(1000003, max_workers=max_workers)
+
+
+def test_check_polynomial_congruence_propagates_errors(monkeypatch):
+    monkeypatch.setattr(new_AKS, "_congruence_holds", _broken)
+    with pytest.raises(TypeError):
+        new_AKS.check_polynomial_congruence((1, 1000003, 23))
+
+
+def test_is_prime_aks_parallel_is_quiet_by_default(capsys):
+    events = []
+    assert new_AKS.is_prime_aks_parallel(1000003, progress=events.append) is True
+    assert capsys.readouterr().out == ""
+    assert any(e["phase"] == "congruence" and e["a"] > 0 for e in events)
+    assert events[-1] == {"phase": "done", "n": 1000003, "result": True}
+
+
+def test_import_leaves_gmpy2_context_alone():
+    import gmpy2
+    assert gmpy2.get_context().precision == gmpy2.context().precision
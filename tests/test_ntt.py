@@ -0,0 +1,17 @@
+import random
+
+import numpy as np
+
+from SubDef.SD_Polynomial import ntt_mul_mod, poly_mul_mod
+
+
+def test_ntt_matches_kronecker():
+    rng = random.Random(0)
+    for r, n in [(1, 7), (5, 101), (97, 1000003), (431, 2 ** 31 - 1), (1021, 2 ** 61 - 1)]:
+        a = [rng.randrange(n) for _ in range(r)]
+        b = [rng.randrange(n) for _ in range(r)]
+        expected = poly_mul_mod(a, b, r, n)
+        A = np.array(a, dtype=np.uint64)
+        B = np.array(b, dtype=np.uint64)
+        assert [int(c) for c in ntt_mul_mod(A, B, r, n)] == expected
+        assert [int(c) for c in ntt_mul_mod(A, A, r, n)] == poly_mul_mod(a, a, r, n)
@@ -0,0 +1,28 @@
+import gmpy2
+import pytest
+
+import NumberTheory
+from SubDef import SD_Primitive_Root
+from SubDef.SD_Perfect_Power import perfect_power
+
+
+@pytest.mark.parametrize("base, exp", [(2, 2), (3, 5), (6, 6), (10, 30), (gmpy2.next_prime(2 ** 40), 3)])
+def test_perfect_power_largest_exponent(base, exp):
+    assert perfect_power(base ** exp) == (base, exp)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 5, 12, 2 ** 61 - 1, 10 ** 30 + 1])
+def test_not_perfect_power(n):
+    assert perfect_power(n) is None
+
+
+def test_shared_detector():
+    assert NumberTheory.perfect_power is perfect_power
+    assert SD_Primitive_Root.perfect_power is perfect_power
+
+
+def test_factorize_prime_powers():
+    p, q = gmpy2.next_prime(2 ** 40), gmpy2.next_prime(2 ** 50)
+    SD_Primitive_Root._factorize_cached.cache_clear()
+    assert SD_Primitive_Root.factorize(p ** 4) == {p: 4}
+    assert SD_Primitive_Root.factorize((p * q) ** 3) == {p: 3, q: 3}
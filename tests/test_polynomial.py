@@ -0,0 +1,38 @@
+import random
+
+from gmpy2 import mpz
+
+import new_AKS
+from SubDef.SD_Polynomial import poly_mul_mod, poly_pow_mod
+
+
+def _naive_mul_mod(p1, p2, r, n):
+    res = [0] * r
+    for i, a in enumerate(p1):
+        for j, b in enumerate(p2):
+            res[(i + j) % r] = (res[(i + j) % r] + a * b) % n
+    return res
+
+
+def test_poly_mul_mod_accepts_mpz():
+    rng = random.Random(0)
+    r, n = 17, 1000003
+    p1 = [rng.randrange(n) for _ in range(r)]
+    p2 = [rng.randrange(n) for _ in range(r)]
+    expected = _naive_mul_mod(p1, p2, r, n)
+    assert poly_mul_mod(p1, p2, mpz(r), mpz(n)) == expected
+    assert poly_mul_mod(p1, p2, r, n) == expected
+    assert poly_pow_mod([1, 1], mpz(n), mpz(r), mpz(n)) == poly_pow_mod([1, 1], n, r, n)
+
+
+def test_check_polynomial_congruence_with_mpz_r():
+    n = 1000003
+    r = new_AKS.find_r_optimized(n)
+    assert isinstance(r, type(mpz(0)))
+    assert new_AKS.check_polynomial_congruence((1, n, r)) == (1, True)
+    assert new_AKS.check_polynomial_congruence((1, 1000001, new_AKS.find_r_optimized(1000001)))[1] is False
+
+
+def test_is_prime_aks_parallel_small_prime():
+    assert new_AKS.is_prime_aks_parallel(1000003, verbose=False) is True
+    assert new_AKS.is_prime_aks_parallel(1000001, verbose=False) is False
@@ -0,0 +1,15 @@
+import gmpy2
+
+from SubDef.SD_SIQS import siqs_factor
+
+
+def test_siqs_splits_30_digit_semiprime():
+    p, q = gmpy2.next_prime(10 ** 14 + 12345), gmpy2.next_prime(3 * 10 ** 15)
+    d = siqs_factor(p * q, use_parallel=False)
+    assert d in (p, q)
+
+
+def test_siqs_square_and_even():
+    p = gmpy2.next_prime(10 ** 12)
+    assert siqs_factor(p * p, use_parallel=False) == p
+    assert siqs_factor(2 * p, use_parallel=False) == 2
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from NumberTheory import sqrt_many, sqrt_mod
+
+PRIMES = [
+    1000003,            # 3 mod 4
+    1000037,            # 5 mod 8 (Atkin)
+    2 ** 255 - 19,      # 5 mod 8, lớn
+    1000033,            # 1 mod 8, Tonelli-Shanks
+    998244353,          # 1 mod 8, 2-adic lớn: Cipolla
+    2 ** 224 - 2 ** 96 + 1,  # 1 mod 8 lớn (P-224)
+]
+
+
+@pytest.mark.parametrize("p", PRIMES)
+def test_sqrt_mod_residues(p):
+    rng = random.Random(p)
+    for _ in range(20):
+        x = rng.randrange(1, p)
+        r = sqrt_mod(x * x, p)
+        assert r * r % p == x * x % p
+    assert sqrt_mod(0, p) == 0
+    # Có đúng (p - 1) / 2 số không chính phương: tìm một số và kiểm tra trả về None
+    a = next(a for a in range(2, 100) if pow(a, (p - 1) // 2, p) == p - 1)
+    assert sqrt_mod(a, p) is None
+
+
+@pytest.mark.parametrize("p", PRIMES)
+def test_sqrt_many_matches_sqrt_mod(p):
+    values = list(range(0, 60))
+    roots = sqrt_many(values, p)
+    for v, r in zip(values, roots):
+        single = sqrt_mod(v, p)
+        assert (r is None) == (single is None)
+        if r is not None:
+            assert r * r % p == v % p
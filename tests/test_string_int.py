@@ -0,0 +1,30 @@
+import pytest
+
+from SubDef.String_Int import blocks_to_text, block_size, int_to_text, iter_blocks, text_to_int
+
+MODULUS = 2 ** 64 + 13  # 7 byte dữ liệu mỗi khối
+
+
+@pytest.mark.parametrize("text", ["", "a", "\x00ab", "Nguyễn Hải Nam 23021643", "€" * 10, "日本語テキスト" * 3])
+def test_block_round_trip(text):
+    blocks = list(iter_blocks(text, MODULUS))
+    assert all(0 < b < MODULUS for b in blocks)
+    assert blocks_to_text(blocks) == text
+
+
+def test_multibyte_characters_split_across_blocks():
+    size = block_size(MODULUS)
+    text = "a" * (size - 1) + "ễ" + "€" * size
+    blocks = list(iter_blocks(text, MODULUS))
+    assert len(blocks) > 2
+    assert blocks_to_text(blocks) == text
+
+
+def test_iter_blocks_accepts_chunks():
+    chunks = ["Nguyễn ", "Hải", " Nam"]
+    assert list(iter_blocks(chunks, MODULUS)) == list(iter_blocks("".join(chunks), MODULUS))
+
+
+def test_text_int_round_trip():
+    assert int_to_text(text_to_int("Nguyễn")) == "Nguyễn"
+    assert text_to_int("") == 0